@@ -0,0 +1,146 @@
+import math
+
+import numpy as np
+
+# Batched enemy behaviour. Every function works on a whole entity store at
+# once: positions are (n, 2) arrays of centers and targets is a (t, 2) array,
+# so one call moves every chaser or every bouncing mover, whatever the count.
+# Chasers and shooters go after whichever target is nearest to them.
+# A store of a few rows costs NumPy more in per-call overhead than the work
+# itself, so up to DIRECT_ROWS rows are moved one by one in plain Python,
+# with the same float operations in the same order, so both ways give
+# bit-identical results.
+
+DIRECT_ROWS = 8
+
+def round_half_away(values):
+    # pygame.Rect rounds float coordinates half away from zero; movers that
+    # used to live in a Rect keep that rounding so they move exactly as before
+    return np.copysign(np.floor(np.abs(values) + 0.5), values)
+
+def nearest_offsets(pos, targets):
+    # Offset from each position to its nearest target, and its length
+    offsets = targets[np.newaxis, :, :] - pos[:, np.newaxis, :]
+    distances = np.sqrt(np.square(offsets).sum(axis=2))
+    if len(targets) == 1:
+        return offsets[:, 0], distances[:, 0]
+    nearest = distances.argmin(axis=1)
+    rows = np.arange(len(pos))
+    return offsets[rows, nearest], distances[rows, nearest]
+
+def home(pos, velocity, targets, speed, delta_time):
+    # Point every velocity straight at its nearest target and move, in place
+    if not len(pos):
+        return
+    if len(targets):
+        velocity[:] = aim(pos, targets, speed)[0]
+    else:
+        velocity[:] = 0
+    pos += velocity * delta_time
+
+def aim(pos, targets, speed):
+    # Velocities of speed toward each position's nearest target, plus a mask of
+    # the positions that have a direction at all (not sitting on a target)
+    if len(pos) <= DIRECT_ROWS:
+        return _aim_rows(pos, targets, speed)
+    offsets, distances = nearest_offsets(pos, targets)
+    valid = distances > 0
+    velocities = offsets / np.where(valid, distances, 1)[:, np.newaxis] * speed
+    velocities[~valid] = 0
+    return velocities, valid
+
+def _aim_rows(pos, targets, speed):
+    # aim() one row at a time
+    targets = targets.tolist()
+    velocities, valid = [], []
+    for x, y in pos.tolist():
+        nearest = None
+        for target_x, target_y in targets:
+            dx, dy = target_x - x, target_y - y
+            distance = math.sqrt(dx * dx + dy * dy)
+            if nearest is None or distance < nearest[0]:
+                nearest = (distance, dx, dy)
+        distance, dx, dy = nearest
+        valid.append(distance > 0)
+        velocities.append((dx / distance * speed, dy / distance * speed) if distance > 0 else (0.0, 0.0))
+    return np.array(velocities, dtype=np.float64).reshape(-1, 2), np.array(valid, dtype=bool)
+
+def bounce(pos, velocity, half_size, bounds, delta_time):
+    # Move boxes of half_size around pos (in place) on the integer grid a
+    # pygame.Rect would use, reflecting velocity off the edges of bounds.
+    # A box that went past an edge stops on it and turns around.
+    if not len(pos):
+        return
+    if len(pos) <= DIRECT_ROWS:
+        _bounce_rows(pos, velocity, half_size, bounds, delta_time)
+        return
+    moved = round_half_away(pos + velocity * delta_time)
+    clamped = np.minimum(np.maximum(moved, half_size), np.subtract(bounds, half_size))
+    velocity[clamped != moved] *= -1
+    pos[:] = clamped
+
+def _bounce_rows(pos, velocity, half_size, bounds, delta_time):
+    # bounce() one row at a time, rounding as round_half_away() does
+    high_x, high_y = bounds[0] - half_size, bounds[1] - half_size
+    copysign, floor = math.copysign, math.floor
+    moved, turned = [], []
+    for (x, y), (vx, vy) in zip(pos.tolist(), velocity.tolist()):
+        x += vx * delta_time
+        y += vy * delta_time
+        x = copysign(floor(abs(x) + 0.5), x)
+        y = copysign(floor(abs(y) + 0.5), y)
+        if x < half_size or x > high_x:
+            x = half_size if x < half_size else high_x
+            vx *= -1
+        if y < half_size or y > high_y:
+            y = half_size if y < half_size else high_y
+            vy *= -1
+        moved.append((x, y))
+        turned.append((vx, vy))
+    pos[:] = moved
+    velocity[:] = turned
+
+def _leg(pos, direction, ticks, step_up, step_down, low, high):
+    # Move each coordinate up to `ticks` ticks along its current leg; the ones
+    # that reach an edge stop there, turned around, with the ticks they have left
+    up = direction > 0
+    step = np.where(up, step_up, step_down)
+    room = np.where(up, high - pos, pos - low)
+    # A coordinate clamps on the first tick that would take it past the edge
+    length = np.where(step > 0, np.floor(room / np.maximum(step, 1)) + 1, np.inf)
+    turn = ticks >= length
+    pos = np.where(turn, np.where(up, high, low), pos + direction * ticks * step)
+    ticks = np.where(turn, ticks - length, 0)
+    return pos, np.where(turn, -direction, direction), ticks
+
+def bounce_ahead(pos, velocity, half_size, bounds, delta_time, ticks):
+    # What `ticks` calls of bounce() would do (ticks is per row, at least 1),
+    # worked out in closed form: after one regular step everything is on the
+    # integer grid and moves a whole number of pixels a tick, so each axis
+    # just runs back and forth between its edges, one leg at a time
+    if not len(pos):
+        return
+    bounce(pos, velocity, half_size, bounds, delta_time)
+    remaining = np.asarray(ticks, dtype=np.float64) - 1
+    if not remaining.any():
+        return
+    remaining = np.repeat(remaining[:, np.newaxis], 2, axis=1)
+    speed = np.abs(velocity)
+    direction = np.sign(velocity)
+    # Pixels a tick each way, rounded as bounce() rounds them
+    step_up = np.floor(speed * delta_time + 0.5)
+    step_down = -np.floor(0.5 - speed * delta_time)
+    low = half_size
+    high = np.array(bounds, dtype=np.float64) - half_size
+    span = high - low
+    coord, direction, remaining = _leg(pos, direction, remaining, step_up, step_down, low, high)
+    if remaining.any():
+        # From an edge the motion repeats every period ticks
+        period = np.where((step_up > 0) & (step_down > 0),
+                          np.floor(span / np.maximum(step_up, 1)) + np.floor(span / np.maximum(step_down, 1)) + 2,
+                          np.inf)
+        remaining = np.fmod(remaining, period)
+        coord, direction, remaining = _leg(coord, direction, remaining, step_up, step_down, low, high)
+        coord, direction, remaining = _leg(coord, direction, remaining, step_up, step_down, low, high)
+    pos[:] = coord
+    velocity[:] = np.where(direction != 0, speed * direction, velocity)
@@ -0,0 +1,55 @@
+import math
+
+import pygame
+
+# Scrolling backgrounds made of repeating tiles. Each layer is pre-rendered once
+# into a surface one tile larger than the view, so drawing it is a single blit
+# at the camera offset (wrapped to the tile size). The cost and memory do not
+# depend on the world size, and parallax layers only add one blit each.
+
+def make_grid_tile(cell_size, line_color, fill_color=None):
+    # Fill color makes an opaque base layer; without one the tile is transparent
+    if fill_color is None:
+        tile = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
+    else:
+        tile = pygame.Surface((cell_size, cell_size))
+        tile.fill(fill_color)
+    pygame.draw.line(tile, line_color, (0, 0), (cell_size - 1, 0), 1)
+    pygame.draw.line(tile, line_color, (0, 0), (0, cell_size - 1), 1)
+    return tile
+
+class BackgroundLayer:
+    def __init__(self, tile, view_size, parallax=1.0):
+        self.tile_width, self.tile_height = tile.get_size()
+        self.parallax = parallax
+        width = view_size[0] + self.tile_width
+        height = view_size[1] + self.tile_height
+        transparent = tile.get_flags() & pygame.SRCALPHA
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA if transparent else 0)
+        for x in range(0, width, self.tile_width):
+            for y in range(0, height, self.tile_height):
+                self.surface.blit(tile, (x, y))
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha() if transparent else self.surface.convert()
+
+    def draw(self, target, offset):
+        # Round the offset up so lines land on the same pixels as drawing them
+        # at (line - offset) directly would
+        x = -(math.ceil(offset[0] * self.parallax) % self.tile_width)
+        y = -(math.ceil(offset[1] * self.parallax) % self.tile_height)
+        target.blit(self.surface, (x, y))
+
+class Background:
+    def __init__(self, view_size):
+        self.view_size = view_size
+        self.layers = []
+
+    def add_layer(self, tile, parallax=1.0):
+        # Layers are drawn in the order they are added; the first should be opaque
+        layer = BackgroundLayer(tile, self.view_size, parallax)
+        self.layers.append(layer)
+        return layer
+
+    def draw(self, target, offset):
+        for layer in self.layers:
+            layer.draw(target, offset)
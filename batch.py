@@ -0,0 +1,117 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import game
+import headless
+
+# Run many independent headless games across a process pool. Every run gets
+# its own seed, input policy and game constant overrides (e.g. BLOCK_SPEED=150),
+# and its result is streamed to a JSONL file as soon as it is in. Overrides
+# replace module constants in the worker, so they apply to anything game.py
+# reads at run time; constants derived at import (SIM_DT, SPATIAL_CELL_SIZE,
+# ...) keep their values unless overridden themselves.
+
+DEFAULTS = {name: value for name, value in vars(game).items()
+            if name.isupper() and isinstance(value, (bool, int, float))}
+
+def parse_value(name, text):
+    default = DEFAULTS[name]
+    if isinstance(default, bool):
+        if text.lower() in ("1", "true", "yes", "on"):
+            return True
+        if text.lower() in ("0", "false", "no", "off"):
+            return False
+        raise ValueError(f"{name} expects a boolean, got {text!r}")
+    if isinstance(default, int):
+        # Integer constants like TRIANGLE_FIRE_RATE still take fractional values
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    return float(text)
+
+def parse_assignment(text):
+    name, sep, value = text.partition("=")
+    if not sep or name not in DEFAULTS:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with a numeric game constant, got {text!r}")
+    return name, value
+
+def apply_overrides(overrides):
+    for name, value in DEFAULTS.items():
+        setattr(game, name, value)
+    for name, value in overrides.items():
+        setattr(game, name, value)
+
+def run_one(task):
+    run_id, seed, policy, overrides, max_ticks, delta_time = task
+    apply_overrides(overrides)
+    start = time.perf_counter()
+    world = game.World(seed)
+    headless.run(max_ticks, delta_time, headless.POLICIES[policy](seed), world)
+    return {
+        "run": run_id,
+        "seed": world.seed,
+        "policy": policy,
+        "overrides": overrides,
+        "score": world.score,
+        "survival_time": world.survival_time,
+        "ticks": world.ticks,
+        "game_over": world.game_over,
+        "cause_of_death": world.cause_of_death,
+        "elapsed": time.perf_counter() - start,
+    }
+
+def build_tasks(args):
+    fixed = {name: parse_value(name, value) for name, value in args.set}
+    sweep_names = [name for name, _ in args.sweep]
+    sweep_values = [[parse_value(name, value) for value in values.split(",")] for name, values in args.sweep]
+    run_id = 0
+    for combination in itertools.product(*sweep_values):
+        overrides = dict(fixed)
+        overrides.update(zip(sweep_names, combination))
+        for repeat in range(args.runs):
+            yield (run_id, args.seed + repeat, args.policy, overrides, args.max_ticks, args.dt)
+            run_id += 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless games in parallel and stream results as JSONL.")
+    parser.add_argument("--runs", type=int, default=100, help="runs per parameter combination")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run; run i uses seed + i")
+    parser.add_argument("--policy", choices=sorted(headless.POLICIES), default="random")
+    parser.add_argument("--set", type=parse_assignment, action="append", default=[], metavar="NAME=VALUE",
+                        help="override a game constant for every run")
+    parser.add_argument("--sweep", type=parse_assignment, action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="run every combination of these values")
+    parser.add_argument("--max-ticks", type=int, default=60 * game.FPS * 10)
+    parser.add_argument("--dt", type=float, default=game.SIM_DT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--out", metavar="PATH", default="-", help="JSONL output file (default: stdout)")
+    args = parser.parse_args(argv)
+    try:
+        tasks = list(build_tasks(args))
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w")
+    start = time.perf_counter()
+    count = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for result in executor.map(run_one, tasks, chunksize=args.chunksize):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"{count} runs in {elapsed:.1f}s ({count / elapsed:.1f} runs/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
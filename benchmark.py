@@ -0,0 +1,176 @@
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+# Render into an offscreen surface unless a real display was asked for
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import game
+
+# Scripted worlds for timing the simulation and render halves of a frame
+# separately. Each scenario builds on a seeded World with the player shielded
+# for the whole run, so every run lasts exactly --ticks ticks.
+
+def random_point(world, margin):
+    return (world.rng.uniform(margin, game.WORLD_WIDTH - margin),
+            world.rng.uniform(margin, game.WORLD_HEIGHT - margin))
+
+def add_blocks(world, n):
+    for _ in range(n):
+        x, y = random_point(world, game.BLOCK_SIZE)
+        world.add_block(int(x), int(y))
+
+def add_red_circles(world, n):
+    for _ in range(n):
+        x, y = random_point(world, game.RED_CIRCLE_RADIUS)
+        world.add_red_circle(x, y)
+
+def add_triangles(world, n):
+    for _ in range(n):
+        x, y = random_point(world, game.TRIANGLE_SIZE)
+        world.add_triangle(x, y)
+
+def keep_firing(world, n):
+    # Top the player's bullets back up to n, fired from the head in all directions
+    head_x, head_y = world.get_head_position()
+    while len(world.bullets) < n:
+        angle = world.rng.uniform(0, 2 * math.pi)
+        world.bullets.add(pos=(head_x, head_y),
+                          velocity=(math.cos(angle) * game.BULLET_SPEED, math.sin(angle) * game.BULLET_SPEED))
+
+def particle_bursts(world, n):
+    # A burst of n particles every PARTICLE_LIFETIME
+    if world.ticks % max(1, int(game.PARTICLE_LIFETIME / game.SIM_DT)) == 0:
+        x, y = random_point(world, 0)
+        world.spawn_particles(x, y, n)
+
+# name -> (build once, feed every tick)
+SCENARIOS = {
+    "baseline": (None, None),
+    "blocks": (add_blocks, None),
+    "red_circles": (add_red_circles, None),
+    "triangles": (add_triangles, None),
+    "sustained_fire": (add_blocks, keep_firing),
+    "particle_bursts": (None, particle_bursts),
+}
+
+def build_world(scenario, n, seed):
+    world = game.World(seed)
+    world.shield_active = True
+    world.shield_timer = math.inf
+    build, feed = SCENARIOS[scenario]
+    if build is not None:
+        build(world, n)
+        world.index_entities()
+    return world, feed
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+def run_scenario(scenario, n, ticks, seed, render=True, warmup=10):
+    world, feed = build_world(scenario, n, seed)
+    sim_times = []
+    render_times = []
+    for tick in range(warmup + ticks):
+        if feed is not None:
+            feed(world, n)
+        start = time.perf_counter()
+        world.step(game.SIM_DT, game.INPUT_FIRE)
+        sim_end = time.perf_counter()
+        if render:
+            game.render(world)
+        render_end = time.perf_counter()
+        if tick >= warmup:
+            sim_times.append(sim_end - start)
+            render_times.append(render_end - sim_end)
+
+    result = {
+        "scenario": scenario,
+        "n": n,
+        "ticks": ticks,
+        "sim": summarize(sim_times),
+        "frame": summarize(np.add(sim_times, render_times)),
+        "entities": {
+            "blocks": len(world.blocks),
+            "red_circles": len(world.red_circles),
+            "triangles": len(world.triangles),
+            "bullets": len(world.bullets),
+            "enemy_bullets": len(world.enemy_bullets),
+            "particles": len(world.particles),
+        },
+    }
+    if render:
+        result["render"] = summarize(render_times)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the simulation and render phases on scripted worlds.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="comma-separated list from: " + ", ".join(SCENARIOS))
+    parser.add_argument("--sizes", default="10,100,1000", help="comma-separated entity counts")
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-render", action="store_true", help="time the simulation only")
+    parser.add_argument("--world-scale", type=float, default=1.0,
+                        help="multiply the map's area by this (entity counts are not scaled)")
+    parser.add_argument("--out", metavar="PATH", help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenarios.split(",")
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario: {scenario}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if args.world_scale != 1.0:
+        side = math.sqrt(args.world_scale)
+        game.WORLD_WIDTH = int(game.WORLD_WIDTH * side)
+        game.WORLD_HEIGHT = int(game.WORLD_HEIGHT * side)
+    if not args.no_render:
+        game.init_display()
+
+    results = []
+    for scenario in scenarios:
+        for n in ([0] if scenario == "baseline" else sizes):
+            result = run_scenario(scenario, n, args.ticks, args.seed, render=not args.no_render)
+            results.append(result)
+            line = f"{scenario:>16} n={n:<6} sim p50={result['sim']['p50_ms']:.3f}ms p99={result['sim']['p99_ms']:.3f}ms"
+            if "render" in result:
+                line += f"  render p50={result['render']['p50_ms']:.3f}ms p99={result['render']['p99_ms']:.3f}ms"
+            print(line, file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+            "ticks": args.ticks,
+            "seed": args.seed,
+            "world_size": [game.WORLD_WIDTH, game.WORLD_HEIGHT],
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+
+# Simulation level of detail for big maps. The world is cut into square chunks
+# and every entity belongs to the chunk its center is in. Chunks within
+# active_radius chunks of the focus (the player's chunk, counting diagonals as
+# one) tick every tick; chunks within near_radius tick every near_interval
+# ticks, staggered so a different set of them is due each tick; everything
+# further out is frozen. Rows that skip ticks keep count of them and make
+# them up when they are next due, so a frozen entity is fast-forwarded the
+# moment it comes back into range. Only the active chunks take part in
+# collisions. On a map that fits inside the active chunks nothing ever waits.
+
+class ChunkLOD:
+    def __init__(self, world_size, chunk_size, active_radius, near_radius, near_interval):
+        self.world_size = world_size
+        self.chunk_size = chunk_size
+        self.active_radius = active_radius
+        self.near_radius = max(near_radius, active_radius)
+        self.near_interval = max(1, near_interval)
+        self.last_chunk = (math.ceil(world_size[0] / chunk_size) - 1,
+                           math.ceil(world_size[1] / chunk_size) - 1)
+
+    def chunk_of(self, point):
+        return (int(point[0] // self.chunk_size), int(point[1] // self.chunk_size))
+
+    def covers(self, focus):
+        # True if every chunk of the world is active around focus
+        cx, cy = self.chunk_of(focus)
+        r = self.active_radius
+        return cx - r <= 0 and cy - r <= 0 and cx + r >= self.last_chunk[0] and cy + r >= self.last_chunk[1]
+
+    def rings(self, pos, focus):
+        # Chunk distance of each position from the focus chunk, and its chunk
+        chunks = np.floor_divide(pos, self.chunk_size).astype(np.int64)
+        rings = np.abs(chunks - self.chunk_of(focus)).max(axis=1) if len(pos) else np.zeros(0, dtype=np.int64)
+        return rings, chunks
+
+    def due(self, pos, focus, tick):
+        # Mask of the positions that update on this tick
+        rings, chunks = self.rings(pos, focus)
+        phase = (chunks[:, 0] + chunks[:, 1] + tick) % self.near_interval == 0
+        return (rings <= self.active_radius) | ((rings <= self.near_radius) & phase)
+
+    def active(self, pos, focus):
+        # Mask of the positions in active chunks
+        return self.rings(pos, focus)[0] <= self.active_radius
+
+    def region(self, focus):
+        # (left, top, right, bottom) of the active chunks, within the world
+        cx, cy = self.chunk_of(focus)
+        r, size = self.active_radius, self.chunk_size
+        return (max(0, (cx - r) * size), max(0, (cy - r) * size),
+                min(self.world_size[0], (cx + r + 1) * size), min(self.world_size[1], (cy + r + 1) * size))
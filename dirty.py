@@ -0,0 +1,59 @@
+import pygame
+
+# Dirty-rectangle presentation. The frame is still drawn in full into the back
+# buffer, but each draw also marks its screen rect with a key describing what
+# was drawn there. Anything whose (rect, key) differs from last frame - moved,
+# changed, appeared or disappeared - is pushed with pygame.display.update;
+# everything else on screen is already correct. When the camera scrolls, on
+# the first frame, or when too many regions changed, it falls back to flip().
+
+class DirtyTracker:
+    def __init__(self, max_rects=64):
+        self.max_rects = max_rects
+        self.previous = set()
+        self.current = set()
+        self.always = []
+        self.previous_always = []
+        self.camera_offset = None
+        self.full_redraw = True
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.last_rect_count = 0
+
+    def invalidate(self):
+        # Next present() pushes the whole screen
+        self.full_redraw = True
+
+    def begin_frame(self, camera_offset):
+        if camera_offset != self.camera_offset:
+            self.camera_offset = camera_offset
+            self.full_redraw = True
+        self.current = set()
+        self.always = []
+
+    def mark(self, rect, key=None):
+        self.current.add((rect.x, rect.y, rect.width, rect.height, key))
+
+    def mark_always(self, rect):
+        # For regions that change every frame, like the profiler overlay
+        self.always.append(pygame.Rect(rect))
+
+    def present(self):
+        changed = self.current ^ self.previous
+        self.previous = self.current
+        # Last frame's always-regions go out once more, so whatever was there
+        # is cleared when one shrinks or stops being drawn
+        always = self.always + self.previous_always
+        self.previous_always = self.always
+        if self.full_redraw or len(changed) + len(always) > self.max_rects:
+            self.full_redraw = False
+            self.full_frames += 1
+            self.last_rect_count = 0
+            pygame.display.flip()
+            return
+        rects = [pygame.Rect(x, y, width, height) for x, y, width, height, _ in changed]
+        rects.extend(always)
+        self.partial_frames += 1
+        self.last_rect_count = len(rects)
+        if rects:
+            pygame.display.update(rects)
@@ -0,0 +1,91 @@
+import numpy as np
+
+# Structure-of-arrays entity store. Each field is one preallocated NumPy array
+# and the live entities are packed into the first `count` rows, so per-tick
+# updates run as a single vectorized operation over `store.<field>[:count]`.
+# Dead rows are recycled in place, so the store doubles as the object pool for
+# its entity type.
+
+class EntityStore:
+    def __init__(self, capacity, fields, grow=True):
+        # fields maps name -> (columns, dtype); one column gives a 1-D array.
+        # A store that can't grow drops adds once it is full.
+        self.fields = fields
+        self.capacity = capacity
+        self.grow = grow
+        self.count = 0
+        self.high_water = 0
+        self.misses = 0
+        # Bytes per row of each field, in pack() order
+        self.row_sizes = [columns * np.dtype(dtype).itemsize for columns, dtype in fields.values()]
+        for name, (columns, dtype) in fields.items():
+            shape = (capacity, columns) if columns > 1 else (capacity,)
+            setattr(self, name, np.zeros(shape, dtype=dtype))
+
+    def __len__(self):
+        return self.count
+
+    def live(self, name):
+        return getattr(self, name)[:self.count]
+
+    def _grow(self):
+        capacity = self.capacity * 2
+        for name in self.fields:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def add(self, **values):
+        # Returns the new row, or -1 if a fixed-capacity store is full
+        if self.count == self.capacity:
+            self.misses += 1
+            if not self.grow:
+                return -1
+            self._grow()
+        index = self.count
+        for name in self.fields:
+            getattr(self, name)[index] = values.get(name, 0)
+        self.count += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return index
+
+    def remove_where(self, mask):
+        # Batched removal of every live row where mask is true; keeps the
+        # survivors in order so collision checks stay deterministic
+        keep = ~mask
+        count = int(keep.sum())
+        if count == self.count:
+            return
+        for name in self.fields:
+            array = getattr(self, name)
+            array[:count] = array[:self.count][keep]
+        self.count = count
+
+    def clear(self):
+        self.count = 0
+
+    def pack(self):
+        # The live rows of every field, one field after another, as raw bytes
+        return b"".join(getattr(self, name)[:self.count].tobytes() for name in self.fields)
+
+    def unpack(self, count, data, offset=0):
+        # Replace the contents with count rows read from pack() output at
+        # offset; returns the offset just past what was read
+        while count > self.capacity:
+            self._grow()
+        for name in self.fields:
+            array = getattr(self, name)
+            values = np.frombuffer(data, dtype=array.dtype, count=count * array[0].size, offset=offset)
+            array[:count] = values.reshape((count,) + array.shape[1:])
+            offset += values.nbytes
+        self.count = count
+        if count > self.high_water:
+            self.high_water = count
+        return offset
+
+    def stats(self):
+        return {"size": self.capacity, "in_use": self.count,
+                "high_water": self.high_water, "misses": self.misses}
@@ -0,0 +1,225 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+import game
+
+# Gym-style environments for training agents, with no display. An action is a
+# combination of INPUT_* bits (arrow keys, SPACE to fire, P for the shield),
+# the reward is the score gained plus a bonus for every second survived, and
+# an observation is a dict of NumPy arrays built straight from the world:
+#   "player"    (PLAYER_FEATURES,) float32: position, velocity, facing, timers
+#   "entities"  (max_entities, ENTITY_FEATURES) float32: the nearest enemies,
+#               enemy bullets and power-ups, nearest first, zero rows padding
+#   "raster"    (len(RASTER_CHANNELS), h, w) uint8, only with raster_cell:
+#               occupancy of a screen-sized area around the player, one cell
+#               per raster_cell pixels
+# VectorEnv steps several independent worlds in lockstep and stacks their
+# observations; a finished world is reset on the spot.
+
+ACTION_COUNT = 64  # every combination of the six input bits
+
+PLAYER_FEATURES = 11
+ENTITY_FEATURES = 7  # kind, dx, dy, vx, vy, distance, extra
+KINDS = ("block", "red_circle", "triangle", "enemy_bullet", "powerup")  # kind column is index + 1
+RASTER_CHANNELS = KINDS + ("bullet", "outside")
+
+class GameEnv:
+    def __init__(self, seed=None, frame_skip=1, max_ticks=None, max_entities=32, raster_cell=None,
+                 score_scale=0.01, survival_reward=1.0):
+        # frame_skip repeats each action for that many ticks; max_ticks ends
+        # (truncates) an episode that runs that long
+        self.world = game.World(0)
+        self.seeds = random.Random(seed)
+        self.frame_skip = frame_skip
+        self.max_ticks = max_ticks
+        self.max_entities = max_entities
+        self.raster_cell = raster_cell
+        self.score_scale = score_scale
+        self.survival_reward = survival_reward
+        self.raster_shape = None
+        if raster_cell:
+            self.raster_shape = (len(RASTER_CHANNELS), -(-game.SCREEN_HEIGHT // raster_cell),
+                                 -(-game.SCREEN_WIDTH // raster_cell))
+
+    def empty_observation(self, batch=()):
+        observation = {
+            "player": np.zeros(batch + (PLAYER_FEATURES,), dtype=np.float32),
+            "entities": np.zeros(batch + (self.max_entities, ENTITY_FEATURES), dtype=np.float32),
+        }
+        if self.raster_shape:
+            observation["raster"] = np.zeros(batch + self.raster_shape, dtype=np.uint8)
+        return observation
+
+    def reset(self, seed=None):
+        # A new episode; without a seed, the next one from the env's own sequence
+        if seed is None:
+            seed = self.seeds.randrange(1 << 32)
+        self.world.reset(seed)
+        return self.observe(), self.info()
+
+    def step(self, action):
+        reward, terminated, truncated = self.advance(action)
+        return self.observe(), reward, terminated, truncated, self.info()
+
+    def advance(self, action):
+        # step() without the observation: returns reward, terminated, truncated
+        world = self.world
+        score, survival_time = world.score, world.survival_time
+        inputs = int(action) & (ACTION_COUNT - 1)
+        for _ in range(self.frame_skip):
+            if world.game_over:
+                break
+            world.step(game.SIM_DT, inputs)
+            inputs &= ~game.INPUT_SHIELD  # a key press, not a held key
+        reward = ((world.score - score) * self.score_scale +
+                  (world.survival_time - survival_time) * self.survival_reward)
+        truncated = self.max_ticks is not None and world.ticks >= self.max_ticks and not world.game_over
+        return reward, world.game_over, truncated
+
+    def info(self):
+        world = self.world
+        return {"seed": world.seed, "ticks": world.ticks, "score": world.score,
+                "cause_of_death": world.cause_of_death}
+
+    def observe(self, out=None):
+        # Fills out (as made by empty_observation) or a new observation
+        if out is None:
+            out = self.empty_observation()
+        world = self.world
+        player = out["player"]
+        player[:] = (
+            world.player_pos[0] / game.WORLD_WIDTH, world.player_pos[1] / game.WORLD_HEIGHT,
+            world.player_velocity[0] / game.PLAYER_SPEED, world.player_velocity[1] / game.PLAYER_SPEED,
+            world.last_direction[0], world.last_direction[1],
+            min(world.fire_timer / game.FIRE_RATE, 1.0),
+            world.shield_active, max(world.shield_timer, 0) / game.SHIELD_DURATION,
+            world.shield_uses / game.MAX_SHIELDS, world.speed_boost_active,
+        )
+
+        pos, velocity, kind, extra = self.entity_table()
+        offset = pos - world.player_pos
+        if "raster" in out:
+            self.rasterize(out["raster"], offset, kind, world.bullets.live("pos") - world.player_pos)
+
+        entities = out["entities"]
+        entities[:] = 0
+        distance = np.hypot(offset[:, 0], offset[:, 1])
+        nearest = np.argsort(distance, kind="stable")[:self.max_entities]
+        rows = len(nearest)
+        entities[:rows, 0] = kind[nearest] + 1
+        entities[:rows, 1] = offset[nearest, 0] / (game.SCREEN_WIDTH / 2)
+        entities[:rows, 2] = offset[nearest, 1] / (game.SCREEN_HEIGHT / 2)
+        entities[:rows, 3:5] = velocity[nearest] / game.BULLET_SPEED
+        entities[:rows, 5] = distance[nearest] / (game.SCREEN_WIDTH / 2)
+        entities[:rows, 6] = extra[nearest]
+        return out
+
+    def entity_table(self):
+        # Positions, velocities, KINDS indices and one extra feature (block
+        # health, triangle reload, power-up type) of everything but the
+        # player's own bullets
+        world = self.world
+        blocks, triangles = world.blocks, world.triangles
+        powerups = world.powerups
+        stores = (blocks, world.red_circles, triangles, world.enemy_bullets)
+        pos = [store.live("pos") for store in stores]
+        velocity = [store.live("velocity") for store in stores]
+        extra = [blocks.live("hit_points") / game.BLOCK_HIT_POINTS, np.zeros(world.red_circles.count),
+                 np.minimum(triangles.live("fire_timer") / game.TRIANGLE_FIRE_RATE, 1.0),
+                 np.zeros(world.enemy_bullets.count)]
+        counts = [store.count for store in stores]
+        if powerups:
+            pos.append(np.array([powerup.pos for powerup in powerups], dtype=np.float64))
+            velocity.append(np.zeros((len(powerups), 2)))
+            extra.append(np.array([powerup.type == "shield" for powerup in powerups], dtype=np.float64))
+            counts.append(len(powerups))
+        kind = np.repeat(np.arange(len(counts)), counts)
+        return np.concatenate(pos), np.concatenate(velocity), kind, np.concatenate(extra)
+
+    def rasterize(self, raster, offset, kind, bullet_offset):
+        # Mark the cell under every entity center, relative to the player
+        raster[:] = 0
+        cell = self.raster_cell
+        channels, height, width = raster.shape
+        origin = np.array([game.SCREEN_WIDTH / 2, game.SCREEN_HEIGHT / 2])
+        for channel, points in ((kind, offset), (np.full(len(bullet_offset), len(KINDS)), bullet_offset)):
+            cells = np.floor((points + origin) / cell).astype(np.int64)
+            inside = (cells[:, 0] >= 0) & (cells[:, 0] < width) & (cells[:, 1] >= 0) & (cells[:, 1] < height)
+            raster[channel[inside], cells[inside, 1], cells[inside, 0]] = 1
+        # Cells past the world's edges
+        left = self.world.player_pos[0] - origin[0]
+        top = self.world.player_pos[1] - origin[1]
+        xs = left + (np.arange(width) + 0.5) * cell
+        ys = top + (np.arange(height) + 0.5) * cell
+        outside = ((xs < 0) | (xs > game.WORLD_WIDTH))[np.newaxis, :] | ((ys < 0) | (ys > game.WORLD_HEIGHT))[:, np.newaxis]
+        raster[-1] = outside
+
+class VectorEnv:
+    # num_envs GameEnvs stepped together; arrays gain a leading num_envs axis
+    def __init__(self, num_envs, seed=None, **kwargs):
+        seeds = random.Random(seed)
+        self.envs = [GameEnv(seeds.randrange(1 << 32), **kwargs) for _ in range(num_envs)]
+        self.num_envs = num_envs
+        self.observation = self.envs[0].empty_observation((num_envs,))
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+
+    def view(self, index):
+        return {name: array[index] for name, array in self.observation.items()}
+
+    def reset(self, seed=None):
+        # Env i starts from seed + i; returns the stacked observations and infos
+        infos = []
+        for index, env in enumerate(self.envs):
+            env.reset(None if seed is None else seed + index)
+            env.observe(self.view(index))
+            infos.append(env.info())
+        return self.observation, infos
+
+    def step(self, actions):
+        # Returns stacked observations, rewards, terminated and truncated flags
+        # and per-env infos. A finished env is reset right away: its row holds
+        # the first observation of its next episode, and its info the final
+        # score and cause of death of the one that ended.
+        infos = []
+        for index, (env, action) in enumerate(zip(self.envs, actions)):
+            reward, terminated, truncated = env.advance(action)
+            self.rewards[index] = reward
+            self.terminated[index] = terminated
+            self.truncated[index] = truncated
+            infos.append(env.info())
+            if terminated or truncated:
+                env.reset()
+            env.observe(self.view(index))
+        return self.observation, self.rewards, self.terminated, self.truncated, infos
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure environment throughput with random actions.")
+    parser.add_argument("--envs", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=2000, help="vector steps to take")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frame-skip", type=int, default=1)
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--raster-cell", type=int, default=None, help="add an occupancy raster with this cell size")
+    args = parser.parse_args(argv)
+
+    env = VectorEnv(args.envs, args.seed, frame_skip=args.frame_skip, max_ticks=args.max_ticks,
+                    raster_cell=args.raster_cell)
+    env.reset(args.seed)
+    rng = np.random.default_rng(args.seed)
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, terminated, truncated, _ = env.step(rng.integers(0, ACTION_COUNT, args.envs))
+        episodes += int(terminated.sum() + truncated.sum())
+    elapsed = time.perf_counter() - start
+    steps = args.steps * args.envs
+    print(f"{steps / elapsed:.0f} env steps/s ({steps * args.frame_skip / elapsed:.0f} ticks/s), "
+          f"{episodes} episodes, {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
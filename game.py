@@ -1,17 +1,39 @@
+import time
+
+# Startup is timed from here, before the heavy imports (pygame, NumPy)
+STARTUP_BEGIN = time.perf_counter()
+
 import pygame
 import asyncio
 import platform
 import math
 import random
-import time
+import sys
 
-# Initialize Pygame
-pygame.init()
+import numpy as np
+
+import ai
+from background import Background, make_grid_tile
+from chunks import ChunkLOD
+from dirty import DirtyTracker
+from entity_store import EntityStore
+from input_log import InputLog
+from particle_renderer import ParticleRenderer
+from pool import ObjectPool
+from profiler import Profiler
+from scheduler import FrameScheduler
+from snapshot import SnapshotRing
+from spatial import SpatialHash, sweep_boxes
+from spawner import Spawner
+from sprites import SpriteAtlas, SpriteBatch
+from text_cache import TextCache
 
 # Constants
 SCREEN_WIDTH, SCREEN_HEIGHT = 1200, 800
 WORLD_WIDTH, WORLD_HEIGHT = 2400, 1600
 FPS = 60
+SIM_DT = 1.0 / FPS
+MAX_FRAME_TIME = 0.25
 PLAYER_RADIUS = 10
 HEAD_RADIUS = 5
 SHIELD_RADIUS = 15
@@ -35,7 +57,29 @@ POWERUP_SIZE = 20
 POWERUP_SPAWN_INTERVAL = 10
 MAX_POWERUPS = 2
 PARTICLE_LIFETIME = 0.5
+PARTICLE_BUDGET = 256
+PARTICLE_ALPHA_STEPS = 16
 GRID_SIZE = 50
+TEXT_CACHE_SIZE = 64
+CULL_MARGIN = 20
+MAX_SPAWN_ATTEMPTS = 32
+SPAWN_CELL_SIZE = GRID_SIZE * 2
+SPAWN_PLAYER_CLEARANCE = 0
+SPAWN_AVOID_ENTITIES = False
+SPATIAL_CELL_SIZE = max(GRID_SIZE, BLOCK_SIZE)
+
+# Simulation level of detail (see chunks.py). Enemies within ACTIVE_CHUNK_RADIUS
+# chunks of the player tick every tick, which covers the whole default map;
+# out to NEAR_CHUNK_RADIUS they tick every NEAR_TICK_INTERVAL ticks, and past
+# that they are frozen until the player comes back
+CHUNK_SIZE = 400
+ACTIVE_CHUNK_RADIUS = 5
+NEAR_CHUNK_RADIUS = 7
+NEAR_TICK_INTERVAL = 4
+
+# Bullet hitboxes match the rendered "->" and "<=" glyphs, so they don't need a font
+BULLET_WIDTH, BULLET_HEIGHT = 14, 16
+ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT = 18, 16
 
 # Colors
 ORANGE = (255, 165, 0)
@@ -47,532 +91,1075 @@ GRAY = (100, 100, 100)
 CYAN = (0, 255, 255)
 BLUE = (0, 0, 255)
 
-# Setup display
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("2D Circle Game")
-clock = pygame.time.Clock()
-
-# Fonts
-font = pygame.font.SysFont(None, 24)
-ui_font = pygame.font.SysFont(None, 36)
-
-# Player
-player_pos = [WORLD_WIDTH / 2, WORLD_HEIGHT / 2]
-player_velocity = [0, 0]
-last_direction = [1, 0]
-shield_active = False
-shield_timer = 0
-shield_uses = MAX_SHIELDS
-speed_boost_active = False
-speed_boost_timer = 0
-current_player_speed = PLAYER_SPEED
-score = 0
-
-# Bullets
-class Bullet:
-    def __init__(self, x, y, direction):
-        self.pos = [x, y]
-        self.velocity = [direction[0] * BULLET_SPEED, direction[1] * BULLET_SPEED]
-        self.text = font.render("->", True, WHITE)
-        self.rect = self.text.get_rect(center=(x, y))
+# Input bits for one simulation step (SHIELD is the P key press, not the held key)
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_LEFT = 4
+INPUT_RIGHT = 8
+INPUT_FIRE = 16
+INPUT_SHIELD = 32
 
-# Enemy Bullets
-class EnemyBullet:
-    def __init__(self, x, y, direction):
-        self.pos = [x, y]
-        self.velocity = [direction[0] * BULLET_SPEED, direction[1] * BULLET_SPEED]
-        self.text = font.render("<=", True, WHITE)
-        self.rect = self.text.get_rect(center=(x, y))
-
-# Blocks
-class Block:
-    def __init__(self, x, y):
-        self.rect = pygame.Rect(x, y, BLOCK_SIZE, BLOCK_SIZE)
-        self.hit_points = 5
-        self.direction = random.randint(0, 3)
-        self.velocity = [
-            [0, -BLOCK_SPEED], [0, BLOCK_SPEED],
-            [-BLOCK_SPEED, 0], [BLOCK_SPEED, 0]
-        ][self.direction]
-
-# Red Circles
-class RedCircle:
-    def __init__(self, x, y):
-        self.pos = [x, y]
-        self.radius = RED_CIRCLE_RADIUS
-        self.rect = pygame.Rect(x - RED_CIRCLE_RADIUS, y - RED_CIRCLE_RADIUS,
-                               RED_CIRCLE_RADIUS * 2, RED_CIRCLE_RADIUS * 2)
+# Display, created by init_display() so the simulation can run headless
+screen = None
+font = None
+ui_font = None
+FONT_PATH = None  # a .ttf file to use instead of the font bundled with pygame
+fonts = {}
+background = None
+particle_renderer = None
+sprites = None
+text_cache = TextCache(TEXT_CACHE_SIZE)
 
-# Triangles
-class Triangle:
-    def __init__(self, x, y):
-        self.pos = [x, y]
-        self.direction = random.randint(0, 3)
-        self.velocity = [
-            [0, -TRIANGLE_SPEED], [0, TRIANGLE_SPEED],
-            [-TRIANGLE_SPEED, 0], [TRIANGLE_SPEED, 0]
-        ][self.direction]
-        self.rect = pygame.Rect(x - TRIANGLE_SIZE / 2, y - TRIANGLE_SIZE / 2,
-                               TRIANGLE_SIZE, TRIANGLE_SIZE)
-        self.fire_timer = random.uniform(0, TRIANGLE_FIRE_RATE)
+# Per-phase timing; off unless --profile is given or the overlay is toggled (F3)
+profiler = Profiler()
+TRACE_PATH = "profile_trace.json"
+
+# Optional dirty-rectangle presentation (--dirty-rects); None means a full flip
+dirty_tracker = None
+
+# Paces render frames and simulation ticks for the interactive loop
+scheduler = FrameScheduler(SIM_DT, FPS, MAX_FRAME_TIME)
+
+# A snapshot after every tick: Backspace rewinds REWIND_TICKS, and a crash in
+# step() writes the last good state to CRASH_DUMP_PATH
+SNAPSHOT_HISTORY = FPS * 5
+REWIND_TICKS = FPS
+CRASH_DUMP_PATH = "crash_snapshot.bin"
+history = SnapshotRing(SNAPSHOT_HISTORY)
+
+# Seconds from STARTUP_BEGIN to each startup milestone, for the startup report
+startup = {}
+
+def mark_startup(milestone):
+    if milestone not in startup:
+        startup[milestone] = time.perf_counter() - STARTUP_BEGIN
+
+def report_startup():
+    parts = "  ".join(f"{milestone} {seconds * 1000:.0f}ms" for milestone, seconds in startup.items())
+    print(f"startup: {parts}", file=sys.stderr)
+
+def get_font(size):
+    # Loaded from a file once per size; with FONT_PATH None that is the font
+    # pygame ships, so no system font lookup is needed
+    loaded = fonts.get(size)
+    if loaded is None:
+        loaded = fonts[size] = pygame.font.Font(FONT_PATH, size)
+    return loaded
+
+def init_display():
+    # Only the subsystems the game uses: video (with input events) and fonts
+    global screen, font, ui_font, background, particle_renderer, sprites
+    mark_startup("imports")
+    pygame.display.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("2D Circle Game")
+    mark_startup("display")
+    pygame.font.init()
+    font = get_font(24)
+    ui_font = get_font(36)
+    mark_startup("fonts")
+    text_cache.clear()
+    background = Background((SCREEN_WIDTH, SCREEN_HEIGHT))
+    background.add_layer(make_grid_tile(GRID_SIZE, GRAY, BLACK))
+    particle_renderer = ParticleRenderer((SCREEN_WIDTH, SCREEN_HEIGHT), WHITE, PARTICLE_LIFETIME,
+                                         PARTICLE_BUDGET, PARTICLE_ALPHA_STEPS)
+    sprites = build_sprites()
+    mark_startup("assets")
+
+def circle_sprite(color, radius, width=0):
+    # Drawn where pygame.draw.circle would put a circle centered at (radius, radius)
+    surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+    pygame.draw.circle(surface, color, (radius, radius), radius, width)
+    return surface
+
+def build_sprites():
+    # Every fixed shape the game draws, anchored at the point its draw code
+    # positions it by: a block's top-left corner (its health bar sits above
+    # it, one sprite per hit point count), otherwise the center
+    atlas = SpriteAtlas()
+    for hit_points in range(BLOCK_HIT_POINTS + 1):
+        surface = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE + 10), pygame.SRCALPHA)
+        pygame.draw.rect(surface, GREEN, (0, 10, BLOCK_SIZE, BLOCK_SIZE))
+        pygame.draw.rect(surface, RED, (0, 0, (hit_points / BLOCK_HIT_POINTS) * BLOCK_SIZE, 5))
+        pygame.draw.rect(surface, GRAY, (0, 0, BLOCK_SIZE, 5), 1)
+        atlas.add(("block", hit_points), surface, (0, 10))
+
+    atlas.add("red_circle", circle_sprite(RED, RED_CIRCLE_RADIUS), (RED_CIRCLE_RADIUS, RED_CIRCLE_RADIUS))
+    half = TRIANGLE_SIZE // 2
+    surface = pygame.Surface((TRIANGLE_SIZE + 1, TRIANGLE_SIZE + 1), pygame.SRCALPHA)
+    pygame.draw.polygon(surface, RED, [(half, 0), (0, TRIANGLE_SIZE), (TRIANGLE_SIZE, TRIANGLE_SIZE)])
+    atlas.add("triangle", surface, (half, half))
+
+    for type, letter in (("speed", "S"), ("shield", "P")):
+        surface = pygame.Surface((POWERUP_SIZE, POWERUP_SIZE), pygame.SRCALPHA)
+        surface.fill(BLUE)
+        text = font.render(letter, True, WHITE)
+        surface.blit(text, text.get_rect(center=(POWERUP_SIZE / 2, POWERUP_SIZE / 2)))
+        atlas.add(("powerup", type), surface)
+
+    atlas.add("player", circle_sprite(ORANGE, PLAYER_RADIUS), (PLAYER_RADIUS, PLAYER_RADIUS))
+    atlas.add("head", circle_sprite(ORANGE, HEAD_RADIUS), (HEAD_RADIUS, HEAD_RADIUS))
+    atlas.add("shield", circle_sprite(CYAN, SHIELD_RADIUS, 2), (SHIELD_RADIUS, SHIELD_RADIUS))
+    for kind, glyph in (("bullet", "->"), ("enemy_bullet", "<=")):
+        text = font.render(glyph, True, WHITE)
+        atlas.add(kind, text, (text.get_width() // 2, text.get_height() // 2))
+    atlas.build()
+    return atlas
+
+# Bullets, particles and enemies live in array-backed stores; enemy "pos" is
+# the center of the entity, and "idle" counts the ticks it is waiting to make
+# up (see World.due_rows)
+BULLET_CAPACITY = 256
+PARTICLE_CAPACITY = 1024
+ENEMY_CAPACITY = 64
+BULLET_FIELDS = {
+    "pos": (2, np.float64),
+    "velocity": (2, np.float64),
+}
+PARTICLE_FIELDS = {
+    "pos": (2, np.float64),
+    "velocity": (2, np.float64),
+    "lifetime": (1, np.float64),
+    "radius": (1, np.int32),
+}
+BLOCK_FIELDS = {
+    "pos": (2, np.float64),
+    "velocity": (2, np.float64),
+    "hit_points": (1, np.int32),
+    "idle": (1, np.int64),
+}
+RED_CIRCLE_FIELDS = {
+    "pos": (2, np.float64),
+    "velocity": (2, np.float64),
+    "idle": (1, np.int64),
+}
+TRIANGLE_FIELDS = {
+    "pos": (2, np.float64),
+    "velocity": (2, np.float64),
+    "fire_timer": (1, np.float64),
+    "idle": (1, np.int64),
+}
+BLOCK_HIT_POINTS = 5
+ENEMY_KINDS = ("block", "red_circle", "triangle")  # the grid's labels, in World's store order
+
+# One of the four axis directions, picked the way blocks and triangles always have
+def random_axis_velocity(rng, speed):
+    return [[0, -speed], [0, speed], [-speed, 0], [speed, 0]][rng.randint(0, 3)]
+
+def entity_rect(x, y, width, height):
+    # The collision rect of an entity centered at (x, y); setting center rounds
+    # where the Rect constructor would truncate
+    rect = pygame.Rect(0, 0, width, height)
+    rect.center = (x, y)
+    return rect
+
+def cull_to_region(store, region):
+    left, top, right, bottom = region
+    pos = store.live("pos")
+    inside = (pos[:, 0] >= left) & (pos[:, 0] <= right) & (pos[:, 1] >= top) & (pos[:, 1] <= bottom)
+    store.remove_where(~inside)
+
+def integrate(store, delta_time):
+    store.live("pos")[:] += store.live("velocity") * delta_time
 
 # Power-Ups
 class PowerUp:
-    def __init__(self, x, y, type):
+    def __init__(self, x=0, y=0, type="speed"):
         self.pos = [x, y]
         self.type = type  # "speed" or "shield"
         self.rect = pygame.Rect(x - POWERUP_SIZE / 2, y - POWERUP_SIZE / 2,
                                POWERUP_SIZE, POWERUP_SIZE)
 
-# Particles
-class Particle:
-    def __init__(self, x, y):
-        self.pos = [x, y]
-        self.velocity = [random.uniform(-50, 50), random.uniform(-50, 50)]
-        self.lifetime = PARTICLE_LIFETIME
-        self.radius = random.randint(2, 4)
-
-# Game state
-bullets = []
-enemy_bullets = []
-blocks = []
-red_circles = []
-triangles = []
-powerups = []
-particles = []
-game_over = False
-fire_timer = 0
-spawn_timer = 0
-powerup_spawn_timer = 0
-start_time = time.time()
-survival_time = 0
-
-def get_camera_offset():
-    offset_x = player_pos[0] - SCREEN_WIDTH / 2
-    offset_y = player_pos[1] - SCREEN_HEIGHT / 2
-    offset_x = max(0, min(offset_x, WORLD_WIDTH - SCREEN_WIDTH))
-    offset_y = max(0, min(offset_y, WORLD_HEIGHT - SCREEN_HEIGHT))
-    return offset_x, offset_y
-
-def spawn_blocks(count):
-    for _ in range(count):
-        if len(blocks) >= MAX_BLOCKS:
-            return
-        while True:
-            x = random.randint(0, WORLD_WIDTH - BLOCK_SIZE)
-            y = random.randint(0, WORLD_HEIGHT - BLOCK_SIZE)
-            new_rect = pygame.Rect(x, y, BLOCK_SIZE, BLOCK_SIZE)
-            player_rect = pygame.Rect(player_pos[0] - PLAYER_RADIUS, player_pos[1] - PLAYER_RADIUS,
-                                     PLAYER_RADIUS * 2, PLAYER_RADIUS * 2)
-            if not new_rect.colliderect(player_rect):
-                blocks.append(Block(x, y))
-                break
+    def place(self, x, y, type):
+        # Re-initialize in place so pooled instances can be reused
+        self.pos[0] = x
+        self.pos[1] = y
+        self.type = type
+        self.rect.center = (x, y)
 
-def spawn_red_circles():
-    target_count = len(blocks) // 2
-    red_circles.clear()
-    for _ in range(target_count):
-        while True:
-            x = random.randint(0, WORLD_WIDTH - RED_CIRCLE_RADIUS * 2)
-            y = random.randint(0, WORLD_HEIGHT - RED_CIRCLE_RADIUS * 2)
-            new_rect = pygame.Rect(x, y, RED_CIRCLE_RADIUS * 2, RED_CIRCLE_RADIUS * 2)
-            player_rect = pygame.Rect(player_pos[0] - PLAYER_RADIUS, player_pos[1] - PLAYER_RADIUS,
-                                     PLAYER_RADIUS * 2, PLAYER_RADIUS * 2)
-            if not new_rect.colliderect(player_rect):
-                red_circles.append(RedCircle(x + RED_CIRCLE_RADIUS, y + RED_CIRCLE_RADIUS))
-                break
+# Game state: everything one game needs to step, with no display attached.
+# All randomness comes from the world's own seeded RNG, so a seed plus the
+# per-tick inputs reproduce a run exactly.
+class World:
+    def __init__(self, seed=None):
+        self.rng = random.Random()
+        self.bullets = EntityStore(BULLET_CAPACITY, BULLET_FIELDS)
+        self.enemy_bullets = EntityStore(BULLET_CAPACITY, BULLET_FIELDS)
+        self.blocks = EntityStore(ENEMY_CAPACITY, BLOCK_FIELDS)
+        self.red_circles = EntityStore(ENEMY_CAPACITY, RED_CIRCLE_FIELDS)
+        self.triangles = EntityStore(ENEMY_CAPACITY, TRIANGLE_FIELDS)
+        self.powerups = []
+        self.particles = EntityStore(PARTICLE_CAPACITY, PARTICLE_FIELDS, grow=False)
+        self.powerup_pool = ObjectPool(PowerUp, MAX_POWERUPS)
+        self.grid = SpatialHash(SPATIAL_CELL_SIZE)
+        self.moved_enemy_bullets = 0
+        self.enemy_starts = []
+        self.particle_bursts = []  # where particles spawned this tick, for network clients
+        self.spawner = Spawner(WORLD_WIDTH, WORLD_HEIGHT, SPAWN_CELL_SIZE, MAX_SPAWN_ATTEMPTS)
+        self.bounds = (WORLD_WIDTH, WORLD_HEIGHT)
+        # Collision sizes, worked out from the constants when the world is
+        # made, like bounds, so a run that overrides a size collides at it.
+        # What to take off each enemy kind's rounded center for its box's
+        # left, top, right and bottom, a column per kind:
+        self.enemy_box_offsets = np.array([(size // 2, size // 2, size // 2 - size, size // 2 - size)
+                                           for size in (BLOCK_SIZE, RED_CIRCLE_RADIUS * 2, TRIANGLE_SIZE)]).T
+        # Bullets that move less than the smallest half size of anything in a
+        # collision per tick can't pass through it, so they're only tested
+        # where they end up, as they were before bullets were swept:
+        self.sweep_min_travel = min(BULLET_WIDTH, BULLET_HEIGHT, BLOCK_SIZE, RED_CIRCLE_RADIUS * 2, TRIANGLE_SIZE) / 2
+        self.enemy_sweep_min_travel = min(ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT, PLAYER_RADIUS * 2) / 2
+        self.lod = ChunkLOD(self.bounds, CHUNK_SIZE, ACTIVE_CHUNK_RADIUS, NEAR_CHUNK_RADIUS, NEAR_TICK_INTERVAL)
+        self.reset(seed)
 
-def spawn_triangles():
-    while len(triangles) < NUM_TRIANGLES:
-        while True:
-            x = random.randint(0, WORLD_WIDTH - TRIANGLE_SIZE)
-            y = random.randint(0, WORLD_HEIGHT - TRIANGLE_SIZE)
-            new_rect = pygame.Rect(x, y, TRIANGLE_SIZE, TRIANGLE_SIZE)
-            player_rect = pygame.Rect(player_pos[0] - PLAYER_RADIUS, player_pos[1] - PLAYER_RADIUS,
-                                     PLAYER_RADIUS * 2, PLAYER_RADIUS * 2)
-            if not new_rect.colliderect(player_rect):
-                triangles.append(Triangle(x + TRIANGLE_SIZE / 2, y + TRIANGLE_SIZE / 2))
-                break
+    def reset(self, seed=None):
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.player_pos = [WORLD_WIDTH / 2, WORLD_HEIGHT / 2]
+        self.previous_player_pos = list(self.player_pos)
+        self.player_velocity = [0, 0]
+        self.last_direction = [1, 0]
+        self.game_over = False
+        self.cause_of_death = None
+        self.fire_timer = 0
+        self.spawn_timer = 0
+        self.powerup_spawn_timer = 0
+        self.survival_time = 0
+        self.ticks = 0
+        self.shield_active = False
+        self.shield_timer = 0
+        self.shield_uses = MAX_SHIELDS
+        self.speed_boost_active = False
+        self.speed_boost_timer = 0
+        self.current_player_speed = PLAYER_SPEED
+        self.score = 0
+        self.bullets.clear()
+        self.enemy_bullets.clear()
+        self.blocks.clear()
+        self.red_circles.clear()
+        self.triangles.clear()
+        for powerup in self.powerups:
+            self.powerup_pool.release(powerup)
+        self.powerups.clear()
+        self.particles.clear()
+        self.particle_bursts.clear()
+        self.grid.clear()
+        self.spawn_blocks(INITIAL_BLOCKS)
+        self.spawn_red_circles()
+        self.spawn_triangles()
+        self.spawn_powerup()
+        self.index_entities()
 
-def spawn_powerup():
-    if len(powerups) >= MAX_POWERUPS:
-        return
-    while True:
-        x = random.randint(0, WORLD_WIDTH - POWERUP_SIZE)
-        y = random.randint(0, WORLD_HEIGHT - POWERUP_SIZE)
-        new_rect = pygame.Rect(x, y, POWERUP_SIZE, POWERUP_SIZE)
-        player_rect = pygame.Rect(player_pos[0] - PLAYER_RADIUS, player_pos[1] - PLAYER_RADIUS,
-                                 PLAYER_RADIUS * 2, PLAYER_RADIUS * 2)
-        if not new_rect.colliderect(player_rect):
-            type = random.choice(["speed", "shield"])
-            powerups.append(PowerUp(x + POWERUP_SIZE / 2, y + POWERUP_SIZE / 2, type))
-            break
-
-def spawn_particles(x, y, count=5):
-    for _ in range(count):
-        particles.append(Particle(x, y))
+    def index_entities(self):
+        # Enemies go in the grid as (kind, row) pairs, kind being what
+        # cause_of_death reports for them; power-ups go in as themselves.
+        # Only enemies in active chunks are indexed; nothing reaches the rest.
+        grid = self.grid
+        grid.clear()
+        stores = (self.blocks, self.red_circles, self.triangles)
+        counts = [store.count for store in stores]
+        # The same corners entity_rect would give, for every enemy at once
+        pos = np.concatenate([store.live("pos") for store in stores])
+        centers = ai.round_half_away(pos).astype(np.int64)
+        boxes = np.concatenate((centers.T, centers.T)) - np.repeat(self.enemy_box_offsets, counts, axis=1)
+        everything = self.lod.covers(self.player_pos)
+        start = 0
+        for kind, count in zip(ENEMY_KINDS, counts):
+            rows = range(count)
+            kind_boxes = boxes[:, start:start + count]
+            if not everything:
+                rows = np.flatnonzero(self.lod.active(pos[start:start + count], self.player_pos))
+                kind_boxes = kind_boxes[:, rows]
+            grid.insert_many(kind, rows, kind_boxes)
+            start += count
+        for powerup in self.powerups:
+            grid.insert(powerup, powerup.rect)
 
-def setup():
-    global screen, clock, player_pos, game_over, fire_timer, spawn_timer, powerup_spawn_timer, start_time, survival_time
-    global shield_active, shield_timer, shield_uses, speed_boost_active, speed_boost_timer, current_player_speed, score
-    global bullets, enemy_bullets, blocks, red_circles, triangles, powerups, particles, last_direction
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("2D Circle Game")
-    clock = pygame.time.Clock()
-    player_pos = [WORLD_WIDTH / 2, WORLD_HEIGHT / 2]
-    last_direction = [1, 0]
-    game_over = False
-    fire_timer = 0
-    spawn_timer = 0
-    powerup_spawn_timer = 0
-    start_time = time.time()
-    survival_time = 0
-    shield_active = False
-    shield_timer = 0
-    shield_uses = MAX_SHIELDS
-    speed_boost_active = False
-    speed_boost_timer = 0
-    current_player_speed = PLAYER_SPEED
-    score = 0
-    bullets.clear()
-    enemy_bullets.clear()
-    blocks.clear()
-    red_circles.clear()
-    triangles.clear()
-    powerups.clear()
-    particles.clear()
-    spawn_blocks(INITIAL_BLOCKS)
-    spawn_red_circles()
-    spawn_triangles()
-    spawn_powerup()
-
-def get_head_position():
-    offset = PLAYER_RADIUS + HEAD_RADIUS
-    head_x = player_pos[0] + last_direction[0] * offset
-    head_y = player_pos[1] + last_direction[1] * offset
-    return (head_x, head_y)
+    def enemy_moves(self, box):
+        # How far each of the given boxes in the grid moved this tick, as the
+        # difference of its rounded centers (power-ups stay put), and a mask
+        # of the enemies that spawned during the tick and weren't there for
+        # the rest of it. Only boxes something came near get here, so going
+        # through them one by one beats working out every enemy's move.
+        moves = np.zeros((len(box), 2))
+        spawned = np.zeros(len(box), dtype=bool)
+        starts = dict(zip(ENEMY_KINDS, self.enemy_starts))
+        moved, previous = [], []
+        for i, index in enumerate(box.tolist()):
+            item = self.grid.item(index)
+            if isinstance(item, PowerUp):
+                continue
+            kind, row = item
+            if row < len(starts[kind]):
+                moved.append(i)
+                previous.append(starts[kind][row])
+            else:
+                spawned[i] = True
+        if moved:
+            # A box's rounded center is its middle, whichever way its size rounds
+            boxes = self.grid.boxes()[:, box[moved]].T
+            moves[moved] = (boxes[:, :2] + boxes[:, 2:]) // 2 - ai.round_half_away(np.array(previous))
+        return moves, spawned
 
-def update_loop():
-    global player_pos, player_velocity, fire_timer, game_over, bullets, enemy_bullets, blocks, red_circles, triangles
-    global last_direction, spawn_timer, powerup_spawn_timer, survival_time, shield_active, shield_timer, shield_uses
-    global speed_boost_active, speed_boost_timer, current_player_speed, score, powerups, particles
+    def bullet_targets(self, delta_time):
+        # For each player bullet that overlapped something in the grid this
+        # tick, its index and what it overlapped, first touched first (by
+        # insertion order on a tie). A bullet's rect goes from the corner it
+        # had at the start of the tick to the one it has now, rounded the way
+        # a pygame.Rect rounds them, and is swept relative to each box's own
+        # move unless it moved less than sweep_min_travel.
+        bullets = self.bullets
+        if not bullets.count or not len(self.grid):
+            return []
+        pos = bullets.live("pos")
+        starts = pos - bullets.live("velocity") * delta_time
+        # Boxes can have come this far from outside the area a bullet swept,
+        # and rounding moves either end by up to a pixel more
+        margin = max(BLOCK_SPEED, RED_CIRCLE_SPEED, TRIANGLE_SPEED) * delta_time + 1
+        reach = (BULLET_WIDTH / 2 + margin, BULLET_HEIGHT / 2 + margin)
+        bullet, box = self.grid.pairs(np.minimum(pos, starts) - reach, np.maximum(pos, starts) + reach)
+        if not len(bullet):
+            return []
+        corner = (BULLET_WIDTH / 2, BULLET_HEIGHT / 2)
+        ends = ai.round_half_away(pos[bullet] - corner)
+        travel = ends - ai.round_half_away(starts[bullet] - corner)
+        boxes = self.grid.boxes()[:, box].T
+        half = (boxes[:, 2:] - boxes[:, :2]) / 2
+        offset = ends + corner - (boxes[:, :2] + half)
+        swept = np.abs(travel).max(axis=1) >= self.sweep_min_travel
+        if swept.any():
+            moves, spawned = self.enemy_moves(box)
+            relative = travel - moves
+            relative[spawned | ~swept] = 0
+            fraction = sweep_boxes(offset, relative, half + corner)
+            hit = np.isfinite(fraction)
+            bullet, box, fraction = bullet[hit], box[hit], fraction[hit]
+            order = np.lexsort((box, fraction, bullet))
+            bullet, box = bullet[order], box[order]
+        else:
+            # What sweep_boxes gives with no travel, all at fraction 0 and so
+            # already in order
+            hit = (np.abs(offset) < half + corner).all(axis=1)
+            bullet, box = bullet[hit], box[hit]
+        targets = []
+        for index, box_index in zip(bullet.tolist(), box.tolist()):
+            if not targets or targets[-1][0] != index:
+                targets.append((index, []))
+            targets[-1][1].append(self.grid.item(box_index))
+        return targets
 
-    # Delta time
-    delta_time = clock.tick(FPS) / 1000.0
+    def due_rows(self, store, max_idle=None):
+        # Rows of store to update this tick and how many ticks each one has to
+        # make up (more than one if it was waiting in a distant chunk); None
+        # when every row simply moves one tick, as on a map the active chunks
+        # cover. max_idle caps what a row can make up after being frozen.
+        idle = store.live("idle")
+        if self.lod.covers(self.player_pos) and not idle.any():
+            return None
+        idle += 1
+        if max_idle is not None:
+            np.minimum(idle, max_idle, out=idle)
+        rows = np.flatnonzero(self.lod.due(store.live("pos"), self.player_pos, self.ticks))
+        ticks = idle[rows]
+        idle[rows] = 0
+        return rows, ticks
 
-    # Update survival time
-    if not game_over:
-        survival_time = time.time() - start_time
+    def bounce_due(self, store, half_size, delta_time):
+        # Bounce the rows of store that are due off the world edges, making up
+        # their missed ticks in closed form; returns due_rows()' answer
+        due = self.due_rows(store)
+        if due is None:
+            ai.bounce(store.live("pos"), store.live("velocity"), half_size, self.bounds, delta_time)
+            return None
+        rows, ticks = due
+        pos, velocity = store.pos[rows], store.velocity[rows]
+        ai.bounce_ahead(pos, velocity, half_size, self.bounds, delta_time, ticks)
+        store.pos[rows] = pos
+        store.velocity[rows] = velocity
+        return due
 
-    # Handle events
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
+    def targets(self):
+        # Everything chasers and shooters go after, as a (n, 2) array
+        return np.array([self.player_pos], dtype=np.float64)
+
+    def pool_stats(self):
+        return {
+            "bullets": self.bullets.stats(),
+            "enemy_bullets": self.enemy_bullets.stats(),
+            "particles": self.particles.stats(),
+            "blocks": self.blocks.stats(),
+            "red_circles": self.red_circles.stats(),
+            "triangles": self.triangles.stats(),
+            "powerups": self.powerup_pool.stats(),
+        }
+
+    def get_view_rect(self, margin=0):
+        offset_x, offset_y = self.get_camera_offset()
+        return pygame.Rect(offset_x - margin, offset_y - margin,
+                           SCREEN_WIDTH + margin * 2, SCREEN_HEIGHT + margin * 2)
+
+    def get_player_rect(self):
+        return pygame.Rect(self.player_pos[0] - PLAYER_RADIUS, self.player_pos[1] - PLAYER_RADIUS,
+                           PLAYER_RADIUS * 2, PLAYER_RADIUS * 2)
+
+    def get_camera_offset(self, player_pos=None):
+        if player_pos is None:
+            player_pos = self.player_pos
+        offset_x = player_pos[0] - SCREEN_WIDTH / 2
+        offset_y = player_pos[1] - SCREEN_HEIGHT / 2
+        offset_x = max(0, min(offset_x, WORLD_WIDTH - SCREEN_WIDTH))
+        offset_y = max(0, min(offset_y, WORLD_HEIGHT - SCREEN_HEIGHT))
+        return offset_x, offset_y
+
+    def get_head_position(self, player_pos=None):
+        if player_pos is None:
+            player_pos = self.player_pos
+        offset = PLAYER_RADIUS + HEAD_RADIUS
+        head_x = player_pos[0] + self.last_direction[0] * offset
+        head_y = player_pos[1] + self.last_direction[1] * offset
+        return (head_x, head_y)
+
+    def get_render_player_pos(self, alpha):
+        # Player position alpha of the way from the previous tick to this one
+        previous, current = self.previous_player_pos, self.player_pos
+        return (previous[0] + (current[0] - previous[0]) * alpha,
+                previous[1] + (current[1] - previous[1]) * alpha)
+
+    def spawn_exclusions(self):
+        # Zones new entities must not overlap; other entities are avoided
+        # through the spatial index when SPAWN_AVOID_ENTITIES is set
+        player_rect = self.get_player_rect()
+        return [player_rect.inflate(SPAWN_PLAYER_CLEARANCE * 2, SPAWN_PLAYER_CLEARANCE * 2)]
+
+    def find_spawn(self, width, height, exclusions):
+        grid = self.grid if SPAWN_AVOID_ENTITIES else None
+        return self.spawner.place(self.rng, width, height, exclusions, grid)
+
+    def add_spawned(self, item, rect):
+        if SPAWN_AVOID_ENTITIES:
+            # Index right away so later spawns in the same batch avoid it too
+            self.grid.insert(item, rect)
+
+    def add_block(self, x, y):
+        # Block with its top-left corner at (x, y)
+        velocity = random_axis_velocity(self.rng, BLOCK_SPEED)
+        index = self.blocks.add(pos=(x + BLOCK_SIZE / 2, y + BLOCK_SIZE / 2), velocity=velocity,
+                                hit_points=BLOCK_HIT_POINTS)
+        self.add_spawned(("block", index), pygame.Rect(x, y, BLOCK_SIZE, BLOCK_SIZE))
+
+    def add_red_circle(self, x, y):
+        index = self.red_circles.add(pos=(x, y))
+        self.add_spawned(("red_circle", index), entity_rect(x, y, RED_CIRCLE_RADIUS * 2, RED_CIRCLE_RADIUS * 2))
+
+    def add_triangle(self, x, y):
+        velocity = random_axis_velocity(self.rng, TRIANGLE_SPEED)
+        index = self.triangles.add(pos=(x, y), velocity=velocity,
+                                   fire_timer=self.rng.uniform(0, TRIANGLE_FIRE_RATE))
+        self.add_spawned(("triangle", index), entity_rect(x, y, TRIANGLE_SIZE, TRIANGLE_SIZE))
+
+    def spawn_blocks(self, count):
+        exclusions = self.spawn_exclusions()
+        for _ in range(count):
+            if len(self.blocks) >= MAX_BLOCKS:
+                return
+            spot = self.find_spawn(BLOCK_SIZE, BLOCK_SIZE, exclusions)
+            if spot is None:
+                return
+            self.add_block(spot[0], spot[1])
+
+    def spawn_red_circles(self):
+        # Top up to half the block count instead of regenerating every circle
+        target_count = len(self.blocks) // 2
+        exclusions = self.spawn_exclusions()
+        while len(self.red_circles) < target_count:
+            spot = self.find_spawn(RED_CIRCLE_RADIUS * 2, RED_CIRCLE_RADIUS * 2, exclusions)
+            if spot is None:
+                return
+            self.add_red_circle(spot[0] + RED_CIRCLE_RADIUS, spot[1] + RED_CIRCLE_RADIUS)
+
+    def spawn_triangles(self):
+        if len(self.triangles) >= NUM_TRIANGLES:
+            return
+        exclusions = self.spawn_exclusions()
+        while len(self.triangles) < NUM_TRIANGLES:
+            spot = self.find_spawn(TRIANGLE_SIZE, TRIANGLE_SIZE, exclusions)
+            if spot is None:
+                return
+            self.add_triangle(spot[0] + TRIANGLE_SIZE / 2, spot[1] + TRIANGLE_SIZE / 2)
+
+    def spawn_powerup(self):
+        if len(self.powerups) >= MAX_POWERUPS:
+            return
+        spot = self.find_spawn(POWERUP_SIZE, POWERUP_SIZE, self.spawn_exclusions())
+        if spot is None:
+            return
+        type = self.rng.choice(["speed", "shield"])
+        powerup = self.powerup_pool.acquire()
+        powerup.place(spot[0] + POWERUP_SIZE / 2, spot[1] + POWERUP_SIZE / 2, type)
+        self.powerups.append(powerup)
+        self.add_spawned(powerup, powerup.rect)
+
+    def spawn_particles(self, x, y, count=5):
+        self.particle_bursts.append((x, y))
+        for _ in range(count):
+            velocity = (self.rng.uniform(-50, 50), self.rng.uniform(-50, 50))
+            self.particles.add(pos=(x, y), velocity=velocity, lifetime=PARTICLE_LIFETIME,
+                               radius=self.rng.randint(2, 4))
+
+    def step(self, delta_time, inputs):
+        if self.game_over:
             return
-        if event.type == pygame.KEYDOWN:
-            if game_over and event.key == pygame.K_r:
-                setup()  # Restart game
-            if not game_over and event.key == pygame.K_p and shield_uses > 0:
-                shield_active = True
-                shield_timer = SHIELD_DURATION
-                shield_uses -= 1
-
-    if not game_over:
+        self.ticks += 1
+        self.survival_time += delta_time
+        self.particle_bursts.clear()
+        scope = profiler.scope
+        with scope("timers"):
+            self.update_timers(delta_time, inputs)
+        with scope("player"):
+            self.update_player(delta_time, inputs)
+        with scope("bullets"):
+            self.update_bullets(delta_time)
+        with scope("blocks"):
+            self.update_blocks(delta_time)
+        with scope("red_circles"):
+            self.update_red_circles(delta_time)
+        with scope("triangles"):
+            self.update_triangles(delta_time)
+        with scope("powerups"):
+            self.update_powerups(delta_time)
+        with scope("particles"):
+            self.update_particles(delta_time)
+        with scope("spawns"):
+            self.spawn_triangles()
+        with scope("collisions"):
+            self.resolve_collisions(delta_time)
+
+    def update_timers(self, delta_time, inputs):
+        # Shield key
+        if inputs & INPUT_SHIELD and self.shield_uses > 0:
+            self.shield_active = True
+            self.shield_timer = SHIELD_DURATION
+            self.shield_uses -= 1
+
         # Update shield
-        if shield_active:
-            shield_timer -= delta_time
-            if shield_timer <= 0:
-                shield_active = False
+        if self.shield_active:
+            self.shield_timer -= delta_time
+            if self.shield_timer <= 0:
+                self.shield_active = False
 
         # Update speed boost
-        if speed_boost_active:
-            speed_boost_timer -= delta_time
-            if speed_boost_timer <= 0:
-                speed_boost_active = False
-                current_player_speed = PLAYER_SPEED
+        if self.speed_boost_active:
+            self.speed_boost_timer -= delta_time
+            if self.speed_boost_timer <= 0:
+                self.speed_boost_active = False
+                self.current_player_speed = PLAYER_SPEED
 
+    def update_player(self, delta_time, inputs):
         # Handle input for 360-degree movement
-        player_velocity = [0, 0]
-        keys = pygame.key.get_pressed()
         dx, dy = 0, 0
-        if keys[pygame.K_UP]:
+        if inputs & INPUT_UP:
             dy -= 1
-        if keys[pygame.K_DOWN]:
+        if inputs & INPUT_DOWN:
             dy += 1
-        if keys[pygame.K_LEFT]:
+        if inputs & INPUT_LEFT:
             dx -= 1
-        if keys[pygame.K_RIGHT]:
+        if inputs & INPUT_RIGHT:
             dx += 1
 
         # Calculate movement direction
         if dx != 0 or dy != 0:
             angle = math.atan2(dy, dx)
-            player_velocity = [math.cos(angle) * current_player_speed, math.sin(angle) * current_player_speed]
-            last_direction = [math.cos(angle), math.sin(angle)]
+            self.player_velocity = [math.cos(angle) * self.current_player_speed,
+                                    math.sin(angle) * self.current_player_speed]
+            self.last_direction = [math.cos(angle), math.sin(angle)]
         else:
-            player_velocity = [0, 0]
+            self.player_velocity = [0, 0]
 
         # Move player
-        player_pos[0] += player_velocity[0] * delta_time
-        player_pos[1] += player_velocity[1] * delta_time
+        player_pos = self.player_pos
+        self.previous_player_pos[:] = player_pos
+        player_pos[0] += self.player_velocity[0] * delta_time
+        player_pos[1] += self.player_velocity[1] * delta_time
 
         # Keep player in world bounds
         player_pos[0] = max(PLAYER_RADIUS, min(WORLD_WIDTH - PLAYER_RADIUS, player_pos[0]))
         player_pos[1] = max(PLAYER_RADIUS, min(WORLD_HEIGHT - PLAYER_RADIUS, player_pos[1]))
 
         # Shooting from head
-        fire_timer += delta_time
-        if keys[pygame.K_SPACE] and fire_timer >= FIRE_RATE:
-            head_pos = get_head_position()
-            bullet = Bullet(head_pos[0], head_pos[1], last_direction)
-            bullets.append(bullet)
-            fire_timer = 0
+        self.fire_timer += delta_time
+        if inputs & INPUT_FIRE and self.fire_timer >= FIRE_RATE:
+            head_pos = self.get_head_position()
+            self.bullets.add(pos=head_pos, velocity=(self.last_direction[0] * BULLET_SPEED,
+                                                     self.last_direction[1] * BULLET_SPEED))
+            self.fire_timer = 0
 
+    def update_bullets(self, delta_time):
         # Update bullets
-        bullets = [b for b in bullets if 0 <= b.pos[0] <= WORLD_WIDTH and 0 <= b.pos[1] <= WORLD_HEIGHT]
-        for bullet in bullets:
-            bullet.pos[0] += bullet.velocity[0] * delta_time
-            bullet.pos[1] += bullet.velocity[1] * delta_time
-            bullet.rect.center = bullet.pos
-
-        # Update enemy bullets
-        enemy_bullets = [b for b in enemy_bullets if 0 <= b.pos[0] <= WORLD_WIDTH and 0 <= b.pos[1] <= WORLD_HEIGHT]
-        for bullet in enemy_bullets:
-            bullet.pos[0] += bullet.velocity[0] * delta_time
-            bullet.pos[1] += bullet.velocity[1] * delta_time
-            bullet.rect.center = bullet.pos
+        # Bullets only live in the active chunks
+        region = self.lod.region(self.player_pos)
+        cull_to_region(self.bullets, region)
+        integrate(self.bullets, delta_time)
+
+        # Update enemy bullets; ones fired later in the tick haven't moved yet
+        cull_to_region(self.enemy_bullets, region)
+        integrate(self.enemy_bullets, delta_time)
+        self.moved_enemy_bullets = self.enemy_bullets.count
 
+        # Where the enemies start the tick, to sweep bullets against their moves
+        self.enemy_starts = [store.live("pos").copy() for store in (self.blocks, self.red_circles, self.triangles)]
+
+    def update_blocks(self, delta_time):
         # Update blocks
-        spawn_timer += delta_time
-        if spawn_timer >= SPAWN_INTERVAL:
-            spawn_blocks(1)
-            spawn_red_circles()
-            spawn_timer = 0
-
-        for block in blocks:
-            block.rect.x += block.velocity[0] * delta_time
-            block.rect.y += block.velocity[1] * delta_time
-            if block.rect.left < 0:
-                block.rect.left = 0
-                block.velocity[0] = -block.velocity[0]
-            elif block.rect.right > WORLD_WIDTH:
-                block.rect.right = WORLD_WIDTH
-                block.velocity[0] = -block.velocity[0]
-            if block.rect.top < 0:
-                block.rect.top = 0
-                block.velocity[1] = -block.velocity[1]
-            elif block.rect.bottom > WORLD_HEIGHT:
-                block.rect.bottom = WORLD_HEIGHT
-                block.velocity[1] = -block.velocity[1]
-
-        # Update red circles
-        for circle in red_circles:
-            dx = player_pos[0] - circle.pos[0]
-            dy = player_pos[1] - circle.pos[1]
-            distance = math.sqrt(dx**2 + dy**2)
-            if distance > 0:
-                circle.pos[0] += (dx / distance) * RED_CIRCLE_SPEED * delta_time
-                circle.pos[1] += (dy / distance) * RED_CIRCLE_SPEED * delta_time
-            circle.rect.center = circle.pos
-
-        # Update triangles
-        for triangle in triangles:
-            triangle.rect.x += triangle.velocity[0] * delta_time
-            triangle.rect.y += triangle.velocity[1] * delta_time
-            if triangle.rect.left < 0:
-                triangle.rect.left = 0
-                triangle.velocity[0] = -triangle.velocity[0]
-            elif triangle.rect.right > WORLD_WIDTH:
-                triangle.rect.right = WORLD_WIDTH
-                triangle.velocity[0] = -triangle.velocity[0]
-            if triangle.rect.top < 0:
-                triangle.rect.top = 0
-                triangle.velocity[1] = -triangle.velocity[1]
-            elif triangle.rect.bottom > WORLD_HEIGHT:
-                triangle.rect.bottom = WORLD_HEIGHT
-                triangle.velocity[1] = -triangle.velocity[1]
-            triangle.fire_timer += delta_time
-            if triangle.fire_timer >= TRIANGLE_FIRE_RATE:
-                dx = player_pos[0] - triangle.pos[0]
-                dy = player_pos[1] - triangle.pos[1]
-                distance = math.sqrt(dx**2 + dy**2)
-                if distance > 0:
-                    direction = [dx / distance, dy / distance]
-                    enemy_bullets.append(EnemyBullet(triangle.pos[0], triangle.pos[1], direction))
-                triangle.fire_timer = 0
+        self.spawn_timer += delta_time
+        if self.spawn_timer >= SPAWN_INTERVAL:
+            self.spawn_blocks(1)
+            self.spawn_red_circles()
+            self.spawn_timer = 0
+
+        # Blocks bounce off the world edges
+        self.bounce_due(self.blocks, BLOCK_SIZE / 2, delta_time)
+
+    def update_red_circles(self, delta_time):
+        # Red circles home in on the nearest target; one waking up from a frozen
+        # chunk only makes up a near chunk's worth of ticks, since where it
+        # would have got to depends on where the player was all that time
+        circles = self.red_circles
+        due = self.due_rows(circles, max_idle=NEAR_TICK_INTERVAL)
+        if due is None:
+            ai.home(circles.live("pos"), circles.live("velocity"), self.targets(), RED_CIRCLE_SPEED, delta_time)
+            return
+        rows, ticks = due
+        pos, velocity = circles.pos[rows], circles.velocity[rows]
+        ai.home(pos, velocity, self.targets(), RED_CIRCLE_SPEED, ticks[:, np.newaxis] * delta_time)
+        circles.pos[rows] = pos
+        circles.velocity[rows] = velocity
+
+    def update_triangles(self, delta_time):
+        # Triangles bounce like blocks and fire at the nearest target on a timer
+        triangles = self.triangles
+        if not triangles.count:
+            return
+        pos = triangles.live("pos")
+        fire_timer = triangles.live("fire_timer")
+        due = self.bounce_due(triangles, TRIANGLE_SIZE / 2, delta_time)
+        if due is None:
+            fire_timer += delta_time
+            ready = fire_timer >= TRIANGLE_FIRE_RATE
+        else:
+            # A triangle making up several ticks fires at most once
+            rows, ticks = due
+            fire_timer[rows] += ticks * delta_time
+            ready = np.zeros(triangles.count, dtype=bool)
+            ready[rows] = fire_timer[rows] >= TRIANGLE_FIRE_RATE
+        if ready.any():
+            shooters = pos[ready]
+            velocities, valid = ai.aim(shooters, self.targets(), BULLET_SPEED)
+            for shooter, velocity in zip(shooters[valid].tolist(), velocities[valid].tolist()):
+                self.enemy_bullets.add(pos=shooter, velocity=velocity)
+            fire_timer[ready] = 0
 
+    def update_powerups(self, delta_time):
         # Update power-ups
-        powerup_spawn_timer += delta_time
-        if powerup_spawn_timer >= POWERUP_SPAWN_INTERVAL:
-            spawn_powerup()
-            powerup_spawn_timer = 0
+        self.powerup_spawn_timer += delta_time
+        if self.powerup_spawn_timer >= POWERUP_SPAWN_INTERVAL:
+            self.spawn_powerup()
+            self.powerup_spawn_timer = 0
 
+    def update_particles(self, delta_time):
         # Update particles
-        particles[:] = [p for p in particles if p.lifetime > 0]
-        for particle in particles:
-            particle.pos[0] += particle.velocity[0] * delta_time
-            particle.pos[1] += particle.velocity[1] * delta_time
-            particle.lifetime -= delta_time
-
-        # Respawn triangles
-        spawn_triangles()
-
-        # Collision detection: player with blocks, red circles, triangles, enemy bullets, and power-ups
-        player_rect = pygame.Rect(player_pos[0] - PLAYER_RADIUS, player_pos[1] - PLAYER_RADIUS,
-                                 PLAYER_RADIUS * 2, PLAYER_RADIUS * 2)
-        if not shield_active:
-            for block in blocks:
-                if player_rect.colliderect(block.rect):
-                    game_over = True
-            for circle in red_circles:
-                if player_rect.colliderect(circle.rect):
-                    game_over = True
-            for triangle in triangles:
-                if player_rect.colliderect(triangle.rect):
-                    game_over = True
-            for bullet in enemy_bullets:
-                if player_rect.colliderect(bullet.rect):
-                    game_over = True
-
-        for powerup in powerups[:]:
-            if player_rect.colliderect(powerup.rect):
-                if powerup.type == "speed":
-                    speed_boost_active = True
-                    speed_boost_timer = 5
-                    current_player_speed = PLAYER_SPEED * 1.5
-                elif powerup.type == "shield" and shield_uses < MAX_SHIELDS:
-                    shield_uses += 1
-                powerups.remove(powerup)
-
-        # Collision detection: player bullets with blocks, red circles, and triangles
-        for bullet in bullets[:]:
-            hit = False
-            for block in blocks[:]:
-                if bullet.rect.colliderect(block.rect):
-                    block.hit_points -= 1
-                    if block.hit_points <= 0:
-                        spawn_particles(block.rect.centerx, block.rect.centery)
-                        score += 100
-                    bullets.remove(bullet)
-                    hit = True
-                    break
-            if not hit:
-                for circle in red_circles[:]:
-                    if bullet.rect.colliderect(circle.rect):
-                        spawn_particles(circle.pos[0], circle.pos[1])
-                        red_circles.remove(circle)
-                        bullets.remove(bullet)
-                        score += 50
-                        hit = True
-                        break
-            if not hit:
-                for triangle in triangles[:]:
-                    if bullet.rect.colliderect(triangle.rect):
-                        spawn_particles(triangle.pos[0], triangle.pos[1])
-                        triangles.remove(triangle)
-                        bullets.remove(bullet)
-                        score += 75
-                        break
-        blocks = [b for b in blocks if b.hit_points > 0]
-
-    # Render
-    screen.fill(BLACK)
-    offset_x, offset_y = get_camera_offset()
-
-    # Draw background grid
-    for x in range(0, WORLD_WIDTH, GRID_SIZE):
-        pygame.draw.line(screen, GRAY, (x - offset_x, 0), (x - offset_x, SCREEN_HEIGHT), 1)
-    for y in range(0, WORLD_HEIGHT, GRID_SIZE):
-        pygame.draw.line(screen, GRAY, (0, y - offset_y), (SCREEN_WIDTH, y - offset_y), 1)
-
-    # Draw player body, head, and shield
-    player_screen_pos = (player_pos[0] - offset_x, player_pos[1] - offset_y)
-    pygame.draw.circle(screen, ORANGE, player_screen_pos, PLAYER_RADIUS)
-    head_pos = get_head_position()
-    head_screen_pos = (head_pos[0] - offset_x, head_pos[1] - offset_y)
-    pygame.draw.circle(screen, ORANGE, head_screen_pos, HEAD_RADIUS)
-    if shield_active:
-        pygame.draw.circle(screen, CYAN, player_screen_pos, SHIELD_RADIUS, 2)
-
-    # Draw bullets
-    for bullet in bullets:
-        screen_pos = (bullet.pos[0] - offset_x, bullet.pos[1] - offset_y)
-        screen.blit(bullet.text, bullet.text.get_rect(center=screen_pos))
-    for bullet in enemy_bullets:
-        screen_pos = (bullet.pos[0] - offset_x, bullet.pos[1] - offset_y)
-        screen.blit(bullet.text, bullet.text.get_rect(center=screen_pos))
-
-    # Draw blocks and health bars
-    for block in blocks:
-        screen_rect = pygame.Rect(block.rect.x - offset_x, block.rect.y - offset_y,
-                                 block.rect.width, block.rect.height)
-        pygame.draw.rect(screen, GREEN, screen_rect)
-        health_width = (block.hit_points / 5) * BLOCK_SIZE
-        health_rect = pygame.Rect(block.rect.x - offset_x, block.rect.y - offset_y - 10,
-                                 health_width, 5)
-        pygame.draw.rect(screen, RED, health_rect)
-        pygame.draw.rect(screen, GRAY, (block.rect.x - offset_x, block.rect.y - offset_y - 10,
-                                        BLOCK_SIZE, 5), 1)
-
-    # Draw red circles
-    for circle in red_circles:
-        screen_pos = (circle.pos[0] - offset_x, circle.pos[1] - offset_y)
-        pygame.draw.circle(screen, RED, screen_pos, RED_CIRCLE_RADIUS)
-
-    # Draw triangles
-    for triangle in triangles:
-        screen_pos = (triangle.pos[0] - offset_x, triangle.pos[1] - offset_y)
-        points = [
-            (screen_pos[0], screen_pos[1] - TRIANGLE_SIZE / 2),
-            (screen_pos[0] - TRIANGLE_SIZE / 2, screen_pos[1] + TRIANGLE_SIZE / 2),
-            (screen_pos[0] + TRIANGLE_SIZE / 2, screen_pos[1] + TRIANGLE_SIZE / 2)
-        ]
-        pygame.draw.polygon(screen, RED, points)
-
-    # Draw power-ups
-    for powerup in powerups:
-        screen_rect = pygame.Rect(powerup.pos[0] - offset_x - POWERUP_SIZE / 2,
-                                 powerup.pos[1] - offset_y - POWERUP_SIZE / 2,
-                                 POWERUP_SIZE, POWERUP_SIZE)
-        pygame.draw.rect(screen, BLUE, screen_rect)
-        text = font.render("S" if powerup.type == "speed" else "P", True, WHITE)
-        screen.blit(text, text.get_rect(center=screen_rect.center))
-
-    # Draw particles
-    for particle in particles:
-        screen_pos = (particle.pos[0] - offset_x, particle.pos[1] - offset_y)
-        alpha = int(255 * (particle.lifetime / PARTICLE_LIFETIME))
-        color = (WHITE[0], WHITE[1], WHITE[2], alpha)
-        pygame.draw.circle(screen, color, screen_pos, particle.radius)
+        particles = self.particles
+        particles.remove_where(particles.live("lifetime") <= 0)
+        integrate(particles, delta_time)
+        particles.live("lifetime")[:] -= delta_time
+
+    def resolve_collisions(self, delta_time):
+        player_pos = self.player_pos
+        # Collision detection: every pass queries the broad-phase grid, and
+        # removals are batched at the end of the tick. The grid stays valid
+        # afterwards so spawns can avoid what it holds. Bullets are swept
+        # along the whole of this tick's move, relative to whatever they might
+        # hit, so a long tick can't carry one through it.
+        self.index_entities()
+        grid = self.grid
+        removed = set()
+        collected = []
+
+        # Player with blocks, red circles, triangles, enemy bullets, and power-ups
+        player_rect = self.get_player_rect()
+        for item in grid.query(player_rect):
+            if isinstance(item, PowerUp):
+                if item.type == "speed":
+                    self.speed_boost_active = True
+                    self.speed_boost_timer = 5
+                    self.current_player_speed = PLAYER_SPEED * 1.5
+                elif item.type == "shield" and self.shield_uses < MAX_SHIELDS:
+                    self.shield_uses += 1
+                collected.append(item)
+            elif not self.shield_active and not self.game_over:
+                self.game_over = True
+                self.cause_of_death = item[0]
+
+        # Player with enemy bullets, tested against all of them at once and
+        # swept by how far each moved relative to the player, unless it moved
+        # less than enemy_sweep_min_travel
+        if not self.shield_active and self.enemy_bullets.count:
+            travel = self.enemy_bullets.live("velocity") * delta_time
+            travel[self.moved_enemy_bullets:] = 0
+            offset = self.enemy_bullets.live("pos") - player_pos
+            reach = np.array([ENEMY_BULLET_WIDTH / 2 + PLAYER_RADIUS, ENEMY_BULLET_HEIGHT / 2 + PLAYER_RADIUS])
+            swept = np.abs(travel).max(axis=1) >= self.enemy_sweep_min_travel
+            if swept.any():
+                travel -= np.subtract(player_pos, self.previous_player_pos)
+                travel[~swept] = 0
+                hits = np.isfinite(sweep_boxes(offset, travel, reach))
+            else:
+                hits = (np.abs(offset) < reach).all(axis=1)
+            if hits.any() and not self.game_over:
+                self.game_over = True
+                self.cause_of_death = "enemy_bullet"
+
+        # Player bullets with blocks, red circles, and triangles: each one hits
+        # the first thing along its path (by insertion order on a tie)
+        bullet_hits = np.zeros(self.bullets.count, dtype=bool)
+        hit_points = self.blocks.live("hit_points")
+        for index, targets in self.bullet_targets(delta_time):
+            for item in targets:
+                if item in removed or isinstance(item, PowerUp):
+                    continue
+                kind, row = item
+                if kind == "block":
+                    hit_points[row] -= 1
+                    if hit_points[row] <= 0:
+                        x, y = self.blocks.pos[row].tolist()
+                        self.spawn_particles(x, y)
+                        self.score += 100
+                elif kind == "red_circle":
+                    x, y = self.red_circles.pos[row].tolist()
+                    self.spawn_particles(x, y)
+                    removed.add(item)
+                    self.score += 50
+                else:
+                    x, y = self.triangles.pos[row].tolist()
+                    self.spawn_particles(x, y)
+                    removed.add(item)
+                    self.score += 75
+                bullet_hits[index] = True
+                break
+
+        if bullet_hits.any():
+            self.bullets.remove_where(bullet_hits)
+        dead_blocks = hit_points <= 0
+        if removed or collected or dead_blocks.any():
+            # Rows shift once the stores compact, so rebuild the index afterwards
+            self.blocks.remove_where(dead_blocks)
+            for kind, store in (("red_circle", self.red_circles), ("triangle", self.triangles)):
+                dead = np.zeros(store.count, dtype=bool)
+                dead[[row for item_kind, row in removed if item_kind == kind]] = True
+                store.remove_where(dead)
+            for powerup in collected:
+                self.powerup_pool.release(powerup)
+            self.powerups[:] = [p for p in self.powerups if p not in collected]
+            self.index_entities()
+
+# Interactive game
+seed = None
+record_path = None
+trace_path = None
+world = None
+recorder = None
+shield_pending = False
+client = None  # set when playing on a tick server (--connect)
+
+def read_inputs(shield_pressed):
+    keys = pygame.key.get_pressed()
+    inputs = 0
+    if keys[pygame.K_UP]:
+        inputs |= INPUT_UP
+    if keys[pygame.K_DOWN]:
+        inputs |= INPUT_DOWN
+    if keys[pygame.K_LEFT]:
+        inputs |= INPUT_LEFT
+    if keys[pygame.K_RIGHT]:
+        inputs |= INPUT_RIGHT
+    if keys[pygame.K_SPACE]:
+        inputs |= INPUT_FIRE
+    if shield_pressed:
+        inputs |= INPUT_SHIELD
+    return inputs
+
+def in_rect(pos, rect):
+    return ((pos[:, 0] >= rect.left) & (pos[:, 0] < rect.right) &
+            (pos[:, 1] >= rect.top) & (pos[:, 1] < rect.bottom))
+
+def render_positions(store, lag):
+    # Where the store's entities were lag seconds before the current tick,
+    # going back along their velocity
+    pos = store.live("pos")
+    if lag:
+        return pos - store.live("velocity") * lag
+    return pos
 
+def screen_points(pos, offset_x, offset_y, rounding=np.trunc):
+    # Integer screen positions of world points, rounded the way the draw call
+    # that used to place them did (truncated for draw.circle and the Rect
+    # constructor, half away from zero for Rect attributes)
+    return rounding(pos - (offset_x, offset_y)).astype(np.int64)
+
+def draw_player(world, player_pos, offset_x, offset_y, batch):
+    # Queue player body, head, and shield
+    (x, y), (head_x, head_y) = screen_points(np.array([player_pos, world.get_head_position(player_pos)]),
+                                             offset_x, offset_y).tolist()
+    batch.append("player", x, y)
+    batch.append("head", head_x, head_y)
+    if world.shield_active:
+        batch.append("shield", x, y)
+
+def draw_bullets(world, view_rect, offset_x, offset_y, batch, lag=0):
+    # Queue bullets, positioned like text rects centered on them
+    for kind, store in (("bullet", world.bullets), ("enemy_bullet", world.enemy_bullets)):
+        pos = render_positions(store, lag)
+        batch.extend(kind, screen_points(pos[in_rect(pos, view_rect)], offset_x, offset_y, ai.round_half_away))
+
+def visible_rows(pos, width, height, view_rect):
+    # Rows of pos whose width x height box overlaps view_rect
+    return np.flatnonzero((pos[:, 0] - width / 2 < view_rect.right) & (pos[:, 0] + width / 2 > view_rect.left) &
+                          (pos[:, 1] - height / 2 < view_rect.bottom) & (pos[:, 1] + height / 2 > view_rect.top))
+
+def draw_entities(world, view_rect, offset_x, offset_y, batch, lag=0):
+    # Queue blocks with their health bars, red circles, triangles and
+    # power-ups, in that order
+    pos = render_positions(world.blocks, lag)
+    rows = visible_rows(pos, BLOCK_SIZE, BLOCK_SIZE, view_rect)
+    hit_points = np.clip(world.blocks.hit_points[rows], 0, BLOCK_HIT_POINTS).tolist()
+    batch.extend([("block", points) for points in hit_points],
+                 screen_points(pos[rows] - BLOCK_SIZE / 2, offset_x, offset_y))
+
+    pos = render_positions(world.red_circles, lag)
+    rows = visible_rows(pos, RED_CIRCLE_RADIUS * 2, RED_CIRCLE_RADIUS * 2, view_rect)
+    batch.extend("red_circle", screen_points(pos[rows], offset_x, offset_y))
+
+    pos = render_positions(world.triangles, lag)
+    rows = visible_rows(pos, TRIANGLE_SIZE, TRIANGLE_SIZE, view_rect)
+    batch.extend("triangle", screen_points(pos[rows], offset_x, offset_y))
+
+    for item in world.powerups:
+        if not item.rect.colliderect(view_rect):
+            continue
+        batch.append(("powerup", item.type), int(item.pos[0] - offset_x - POWERUP_SIZE / 2),
+                     int(item.pos[1] - offset_y - POWERUP_SIZE / 2))
+
+def draw_particles(world, view_rect, offset_x, offset_y, dirty=None, lag=0):
+    # Draw particles through the alpha layer, composited in one blit
+    particles = world.particles
+    pos = render_positions(particles, lag)
+    visible = in_rect(pos, view_rect)
+    rect = particle_renderer.draw(screen, pos[visible], particles.live("lifetime")[visible],
+                                  particles.live("radius")[visible], (offset_x, offset_y))
+    if dirty is not None and rect is not None:
+        # Particles fade every frame, so the composited area never matches
+        dirty.mark(rect, ("particles", particle_renderer.frame))
+
+def draw_text(text, position, color, dirty=None, center=False):
+    surface = text_cache.render(ui_font, text, color)
+    if center:
+        position = surface.get_rect(center=position)
+    rect = screen.blit(surface, position)
+    if dirty is not None:
+        dirty.mark(rect, text)
+
+def draw_hud(world, dirty=None):
     # Draw UI (fixed to screen)
-    if game_over:
-        text = ui_font.render(f"Game Over - Score: {score} - Survived: {int(survival_time)}s - Press R to Restart", True, RED)
-        text_rect = text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2))
-        screen.blit(text, text_rect)
+    if world.game_over:
+        draw_text(f"Game Over - Score: {world.score} - Survived: {int(world.survival_time)}s - Press R to Restart",
+                  (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2), RED, dirty, center=True)
     else:
-        score_text = ui_font.render(f"Score: {score}", True, WHITE)
-        survival_text = ui_font.render(f"Survival Time: {int(survival_time)}s", True, WHITE)
-        shield_text = ui_font.render(f"Shields: {shield_uses}", True, WHITE)
-        screen.blit(score_text, (10, 40))
-        screen.blit(survival_text, (10, 70))
-        screen.blit(shield_text, (10, 100))
-    move_text = ui_font.render("Use ARROWS to Move", True, WHITE)
-    shoot_text = ui_font.render("Press SPACE to Shoot", True, WHITE)
-    shield_text = ui_font.render("Press P for Shield", True, WHITE)
-    screen.blit(move_text, (10, 10))
-    screen.blit(shoot_text, (10, 130))
-    screen.blit(shield_text, (10, 160))
-    pygame.display.flip()
+        draw_text(f"Score: {world.score}", (10, 40), WHITE, dirty)
+        draw_text(f"Survival Time: {int(world.survival_time)}s", (10, 70), WHITE, dirty)
+        draw_text(f"Shields: {world.shield_uses}", (10, 100), WHITE, dirty)
+    draw_text("Use ARROWS to Move", (10, 10), WHITE, dirty)
+    draw_text("Press SPACE to Shoot", (10, 130), WHITE, dirty)
+    draw_text("Press P for Shield", (10, 160), WHITE, dirty)
+
+def render(world, alpha=1.0, status=None):
+    # alpha is how far between the previous tick and the current one to draw
+    # moving things, so motion stays smooth when frames and ticks don't line up
+    scope = profiler.scope
+    dirty = dirty_tracker
+    if world.game_over:
+        alpha = 1.0
+    lag = (1.0 - alpha) * SIM_DT
+    player_pos = world.get_render_player_pos(alpha)
+    offset_x, offset_y = world.get_camera_offset(player_pos)
+    if dirty is not None:
+        dirty.begin_frame((offset_x, offset_y))
+
+    # Only what overlaps the camera (plus a margin for health bars) is drawn
+    view_rect = world.get_view_rect(CULL_MARGIN)
+
+    with scope("render.background"):
+        # Draw the pre-rendered background grid (also clears the screen)
+        background.draw(screen, (offset_x, offset_y))
+    # The player, bullets and enemies are all atlas sprites, drawn in one blits() call
+    batch = SpriteBatch(sprites)
+    with scope("render.player"):
+        draw_player(world, player_pos, offset_x, offset_y, batch)
+    with scope("render.bullets"):
+        draw_bullets(world, view_rect, offset_x, offset_y, batch, lag)
+    with scope("render.entities"):
+        draw_entities(world, view_rect, offset_x, offset_y, batch, lag)
+    with scope("render.blits"):
+        batch.draw(screen, dirty)
+    with scope("render.particles"):
+        draw_particles(world, view_rect, offset_x, offset_y, dirty, lag)
+    with scope("render.hud"):
+        draw_hud(world, dirty)
+    if profiler.overlay:
+        overlay_rect = profiler.draw_overlay(screen, font, text_cache, SIM_DT, status)
+        if dirty is not None:
+            dirty.mark_always(overlay_rect)
+    with scope("render.present"):
+        if dirty is not None:
+            dirty.present()
+        else:
+            pygame.display.flip()
+
+def setup():
+    global world, recorder, shield_pending
+    if screen is None:
+        init_display()
+    if client is not None:
+        # The server runs the game; world is the replica the client draws
+        world = client.world
+        client.start(seed)
+    elif world is None:
+        world = World(seed)
+    else:
+        world.reset(seed)
+    recorder = InputLog(world.seed, SIM_DT)
+    history.clear()
+    history.push(world)
+    if dirty_tracker is not None:
+        dirty_tracker.invalidate()
+    scheduler.reset()
+    shield_pending = False
+
+def save_recording():
+    if record_path:
+        recorder.final_score = world.score
+        recorder.save(record_path)
+
+def rewind():
+    global shield_pending
+    tick = history.rewind(world, REWIND_TICKS)
+    if tick is None:
+        return
+    # The input log has one entry per tick, so it rewinds along with the world
+    del recorder.inputs[tick:]
+    shield_pending = False
+    if dirty_tracker is not None:
+        dirty_tracker.invalidate()
+
+def write_crash_dump():
+    data = history.latest()
+    if data is not None:
+        with open(CRASH_DUMP_PATH, "wb") as f:
+            f.write(data)
+
+def update_loop():
+    global shield_pending
+
+    # Wall-clock time feeds the scheduler's fixed-timestep accumulator; the
+    # simulation always steps by SIM_DT so runs can be recorded and replayed
+    # exactly, however often frames are drawn
+    scheduler.begin_frame()
+    profiler.begin_frame()
+
+    # Handle events
+    with profiler.scope("events"):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                if client is not None:
+                    client.close()
+                elif not world.game_over:
+                    save_recording()
+                if trace_path:
+                    profiler.export_chrome_trace(trace_path)
+                pygame.quit()
+                return False
+            if event.type == pygame.KEYDOWN:
+                if world.game_over and event.key == pygame.K_r:
+                    setup()  # Restart game
+                if not world.game_over and event.key == pygame.K_p:
+                    shield_pending = True
+                if event.key == pygame.K_BACKSPACE and client is None:
+                    rewind()
+                if event.key == pygame.K_F3:
+                    profiler.toggle_overlay()
+                if event.key == pygame.K_F4 and profiler.frames:
+                    profiler.export_chrome_trace(trace_path or TRACE_PATH)
+
+    for _ in scheduler.ticks():
+        if world.game_over:
+            continue
+        inputs = read_inputs(shield_pending)
+        shield_pending = False
+        if client is not None:
+            client.send_input(inputs)
+            continue
+        recorder.record(inputs)
+        try:
+            world.step(SIM_DT, inputs)
+        except Exception:
+            write_crash_dump()
+            raise
+        with profiler.scope("snapshot"):
+            history.push(world)
+        if world.game_over:
+            save_recording()
+    if client is not None:
+        with profiler.scope("network"):
+            client.poll()
+    if scheduler.should_render():
+        status = None
+        if profiler.overlay:
+            status = (f"{scheduler.fps:.0f} fps  {scheduler.tick_rate:.0f} ticks/s  "
+                      f"{scheduler.skipped_frames} skipped")
+        render(world, scheduler.alpha, status)
+        if "first_frame" not in startup:
+            mark_startup("first_frame")
+            report_startup()
+    scheduler.end_frame()
+    profiler.end_frame()
+    return True
 
 async def main():
     setup()
-    while True:
-        update_loop()
-        await asyncio.sleep(1.0 / FPS)
+    while update_loop():
+        # The only wait in the loop: sleep until the next frame is due
+        await asyncio.sleep(scheduler.delay())
 
 if platform.system() == "Emscripten":
     asyncio.ensure_future(main())
 else:
     if __name__ == "__main__":
+        import argparse
+        parser = argparse.ArgumentParser(description="Play the game.")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--record", metavar="PATH", help="save the input log of each game here")
+        parser.add_argument("--profile", metavar="PATH", help="record per-phase timings and write a Chrome trace here on exit")
+        parser.add_argument("--dirty-rects", action="store_true",
+                            help="only push changed screen regions instead of flipping the whole frame")
+        parser.add_argument("--connect", metavar="HOST:PORT", help="play on a tick server (see server.py)")
+        args = parser.parse_args()
+        if args.connect:
+            from net import Client, SocketTransport
+            host, _, port = args.connect.rpartition(":")
+            client = Client(SocketTransport.connect(host or "127.0.0.1", int(port)), World(0), SIM_DT)
+        if args.dirty_rects:
+            dirty_tracker = DirtyTracker()
+        seed = args.seed
+        record_path = args.record
+        trace_path = args.profile
+        profiler.enabled = trace_path is not None
         asyncio.run(main())
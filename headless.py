@@ -0,0 +1,98 @@
+import argparse
+import random
+import time
+
+import game
+from input_log import InputLog
+
+# Run the simulation with an injected dt and no display, fonts or window.
+
+def idle_policy(world):
+    return 0
+
+class RandomPolicy:
+    # Mashes keys at random from its own seeded RNG, so runs stay reproducible
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def __call__(self, world):
+        inputs = 0
+        for bit in (game.INPUT_UP, game.INPUT_DOWN, game.INPUT_LEFT, game.INPUT_RIGHT, game.INPUT_FIRE):
+            if self.rng.random() < 0.5:
+                inputs |= bit
+        if self.rng.random() < 0.01:
+            inputs |= game.INPUT_SHIELD
+        return inputs
+
+class ScriptedPolicy:
+    # Plays a fixed sequence of per-tick inputs, looping when it runs out
+    def __init__(self, inputs):
+        self.inputs = bytes(inputs)
+
+    def __call__(self, world):
+        return self.inputs[world.ticks % len(self.inputs)]
+
+def strafe_policy(seed=None):
+    # Fire constantly while walking a square, one second per side, and raise
+    # the shield at the start of every lap
+    second = round(1 / game.SIM_DT)
+    sides = (game.INPUT_RIGHT, game.INPUT_DOWN, game.INPUT_LEFT, game.INPUT_UP)
+    inputs = bytearray()
+    for side in sides:
+        inputs.extend([side | game.INPUT_FIRE] * second)
+    inputs[0] |= game.INPUT_SHIELD
+    return ScriptedPolicy(inputs)
+
+POLICIES = {
+    "idle": lambda seed: idle_policy,
+    "random": RandomPolicy,
+    "strafe": strafe_policy,
+}
+
+def run(ticks, delta_time=game.SIM_DT, policy=idle_policy, world=None, log=None):
+    if world is None:
+        world = game.World()
+    for _ in range(ticks):
+        if world.game_over:
+            break
+        inputs = policy(world)
+        if log is not None:
+            log.record(inputs)
+        game.profiler.begin_frame()
+        world.step(delta_time, inputs)
+        game.profiler.end_frame()
+    return world
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the game simulation headless.")
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--dt", type=float, default=game.SIM_DT)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--record", metavar="PATH", help="save the input log of the run here")
+    parser.add_argument("--pool-stats", action="store_true", help="print entity pool usage after the run")
+    parser.add_argument("--profile", metavar="PATH", help="write a Chrome trace of the per-phase timings here")
+    args = parser.parse_args(argv)
+    game.profiler.enabled = args.profile is not None
+
+    world = game.World(args.seed)
+    log = InputLog(world.seed, args.dt)
+    start = time.perf_counter()
+    run(args.ticks, args.dt, POLICIES[args.policy](world.seed), world, log)
+    elapsed = time.perf_counter() - start
+    if args.record:
+        log.final_score = world.score
+        log.save(args.record)
+
+    print(f"seed: {world.seed}  ticks: {world.ticks}  score: {world.score}"
+          f"  survival: {world.survival_time:.2f}s  game_over: {world.game_over}"
+          f"  cause: {world.cause_of_death}")
+    print(f"{world.ticks / elapsed:.0f} ticks/s ({elapsed:.3f}s)")
+    if args.profile:
+        game.profiler.export_chrome_trace(args.profile)
+    if args.pool_stats:
+        for name, stats in world.pool_stats().items():
+            print(f"{name}: " + "  ".join(f"{key}={value}" for key, value in stats.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import struct
+import zlib
+
+# Compact per-tick input recording: one byte of INPUT_* bits per simulation
+# step, plus the world seed and dt needed to reproduce the run exactly. The
+# final tick count and score are stored so a replay can be verified.
+
+MAGIC = b"GINP"
+VERSION = 1
+HEADER = struct.Struct("<4sBqdIq")  # seed signed: --seed and random.Random take negative ones
+
+class InputLog:
+    def __init__(self, seed, delta_time):
+        self.seed = seed
+        self.delta_time = delta_time
+        self.inputs = bytearray()
+        self.final_score = -1
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, inputs):
+        self.inputs.append(inputs)
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, self.seed, self.delta_time, len(self.inputs), self.final_score)
+        return header + zlib.compress(bytes(self.inputs), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, delta_time, ticks, final_score = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not an input log (or an unsupported version)")
+        log = cls(seed, delta_time)
+        log.inputs = bytearray(zlib.decompress(data[HEADER.size:]))
+        if len(log.inputs) != ticks:
+            raise ValueError(f"input log is truncated: expected {ticks} ticks, got {len(log.inputs)}")
+        log.final_score = final_score
+        return log
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
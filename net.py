@@ -0,0 +1,321 @@
+import socket
+import struct
+import time
+import zlib
+from collections import deque
+
+import snapshot
+
+# Server-authoritative play. A TickServer owns one World per connected client
+# (a session) and steps every session on a fixed tick from the inputs its
+# client sent. After each tick it sends the client the world's state: a full
+# snapshot, compressed, as a keyframe every keyframe_interval ticks, and a
+# snapshot delta against the previous state otherwise. Neither carries the RNG,
+# which stays on the server, or the particles: the server sends where particles
+# spawned that tick and the client spawns and moves its own. A Client keeps a
+# replica World that it only restores from those states and draws; it predicts
+# its own player by re-applying the inputs the server hasn't acknowledged yet.
+# Messages are length-prefixed frames, carried either over a TCP socket or, for
+# tests and load generation, an in-process loopback pair.
+
+FRAME = struct.Struct("<BI")  # message type, payload length
+
+HELLO = 1  # client -> server: start a new game with this seed (-1: server picks)
+INPUT = 2  # client -> server: input sequence number and INPUT_* bits
+STATE = 3  # server -> client: tick, last input applied, keyframe flag, bursts, state
+BYE = 4    # either way: the session is over
+
+HELLO_PAYLOAD = struct.Struct("<q")
+INPUT_PAYLOAD = struct.Struct("<IB")
+STATE_PAYLOAD = struct.Struct("<IIBH")  # ... and how many particle bursts follow
+BURST = struct.Struct("<ff")
+
+MAX_QUEUED_INPUTS = 8
+
+def encode(kind, payload=b""):
+    return FRAME.pack(kind, len(payload)) + payload
+
+def decode(message):
+    kind, length = FRAME.unpack_from(message)
+    return kind, message[FRAME.size:FRAME.size + length]
+
+class LoopbackTransport:
+    # One end of an in-process connection; messages are delivered whole and
+    # in order, and byte counts match what a socket would carry
+    def __init__(self):
+        self.inbox = deque()
+        self.peer = None
+        self.closed = False
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @classmethod
+    def pair(cls):
+        a, b = cls(), cls()
+        a.peer, b.peer = b, a
+        return a, b
+
+    def send(self, message):
+        if self.closed or self.peer.closed:
+            return
+        self.bytes_sent += len(message)
+        self.peer.inbox.append(message)
+
+    def receive(self):
+        messages = list(self.inbox)
+        self.inbox.clear()
+        self.bytes_received += sum(len(message) for message in messages)
+        if self.peer.closed:
+            self.closed = True
+        return messages
+
+    def close(self):
+        self.closed = True
+
+class SocketTransport:
+    # A non-blocking TCP socket framed into whole messages
+    def __init__(self, sock):
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.incoming = bytearray()
+        self.outgoing = bytearray()
+        self.closed = False
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @classmethod
+    def connect(cls, host, port):
+        return cls(socket.create_connection((host, port)))
+
+    def send(self, message):
+        if self.closed:
+            return
+        self.outgoing += message
+        self.flush()
+
+    def flush(self):
+        try:
+            while self.outgoing:
+                sent = self.sock.send(self.outgoing)
+                self.bytes_sent += sent
+                del self.outgoing[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.close()
+
+    def receive(self):
+        if self.closed:
+            return []
+        self.flush()
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    self.close()
+                    break
+                self.bytes_received += len(data)
+                self.incoming += data
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.close()
+        messages = []
+        offset = 0
+        while len(self.incoming) - offset >= FRAME.size:
+            _, length = FRAME.unpack_from(self.incoming, offset)
+            end = offset + FRAME.size + length
+            if end > len(self.incoming):
+                break
+            messages.append(bytes(self.incoming[offset:end]))
+            offset = end
+        del self.incoming[:offset]
+        return messages
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.sock.close()
+
+class Session:
+    def __init__(self, transport):
+        self.transport = transport
+        self.world = None
+        self.inputs = deque()
+        self.last_inputs = 0
+        self.last_sequence = 0
+        self.last_state = None
+        self.ticks_sent = 0
+        self.cpu_time = 0.0
+
+class TickServer:
+    def __init__(self, world_factory, delta_time, keyframe_interval=60, held_inputs=0xFF):
+        # world_factory(seed) makes a fresh World for a session. When a
+        # client's input for a tick hasn't arrived, its last input is used
+        # again, keeping only the held_inputs bits (not one-shot presses).
+        self.world_factory = world_factory
+        self.held_inputs = held_inputs
+        self.delta_time = delta_time
+        self.keyframe_interval = keyframe_interval
+        self.sessions = []
+        self.listener = None
+        self.ticks = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cpu_time = 0.0
+
+    def listen(self, host, port):
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        return self.listener.getsockname()[1]
+
+    def add_session(self, transport):
+        session = Session(transport)
+        self.sessions.append(session)
+        return session
+
+    def accept(self):
+        while self.listener is not None:
+            try:
+                sock, _ = self.listener.accept()
+            except BlockingIOError:
+                return
+            self.add_session(SocketTransport(sock))
+
+    def handle(self, session, message):
+        kind, payload = decode(message)
+        if kind == HELLO:
+            (seed,) = HELLO_PAYLOAD.unpack(payload)
+            session.world = self.world_factory(None if seed < 0 else seed)
+            session.inputs.clear()
+            session.last_inputs = 0
+            session.last_state = None
+        elif kind == INPUT:
+            sequence, inputs = INPUT_PAYLOAD.unpack(payload)
+            session.inputs.append((sequence, inputs))
+            if len(session.inputs) > MAX_QUEUED_INPUTS:
+                # A client running ahead only adds latency; drop its oldest inputs
+                session.inputs.popleft()
+        elif kind == BYE:
+            session.transport.close()
+
+    def tick(self):
+        # One fixed step of every session, each followed by its state message
+        self.accept()
+        self.ticks += 1
+        for session in self.sessions:
+            start = time.perf_counter()
+            for message in session.transport.receive():
+                self.handle(session, message)
+            world = session.world
+            if world is None or session.transport.closed:
+                continue
+            inputs = session.last_inputs
+            if session.inputs:
+                session.last_sequence, inputs = session.inputs.popleft()
+            world.step(self.delta_time, inputs)
+            session.last_inputs = inputs & self.held_inputs
+
+            state = snapshot.capture(world, include_rng=False, include_particles=False)
+            keyframe = session.last_state is None or session.ticks_sent % self.keyframe_interval == 0
+            body = zlib.compress(state, 1) if keyframe else snapshot.delta(session.last_state, state, world)
+            session.last_state = state
+            session.ticks_sent += 1
+            bursts = world.particle_bursts
+            header = STATE_PAYLOAD.pack(world.ticks, session.last_sequence, keyframe, len(bursts))
+            session.transport.send(encode(STATE, header + b"".join(BURST.pack(x, y) for x, y in bursts) + body))
+            session.cpu_time += time.perf_counter() - start
+
+        closed = [session for session in self.sessions if session.transport.closed]
+        for session in closed:
+            self.bytes_sent += session.transport.bytes_sent
+            self.bytes_received += session.transport.bytes_received
+            self.cpu_time += session.cpu_time
+            self.sessions.remove(session)
+
+    def stats(self):
+        # Totals over every session so far, including the ones that ended
+        live = [session for session in self.sessions if session.world is not None]
+        return {
+            "ticks": self.ticks,
+            "sessions": len(live),
+            "bytes_sent": self.bytes_sent + sum(s.transport.bytes_sent for s in self.sessions),
+            "bytes_received": self.bytes_received + sum(s.transport.bytes_received for s in self.sessions),
+            "cpu_time": self.cpu_time + sum(s.cpu_time for s in self.sessions),
+        }
+
+    def serve_forever(self, max_ticks=None):
+        next_tick = time.perf_counter()
+        while max_ticks is None or self.ticks < max_ticks:
+            self.tick()
+            next_tick += self.delta_time
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+
+class Client:
+    # Draws a replica of the server's world and predicts its own player
+    def __init__(self, transport, world, delta_time):
+        self.transport = transport
+        self.world = world
+        self.delta_time = delta_time
+        self.sequence = 0
+        self.pending = deque()
+        self.state = None
+        self.server_tick = 0
+        self.cpu_time = 0.0
+
+    def start(self, seed=None):
+        self.pending.clear()
+        self.state = None
+        self.transport.send(encode(HELLO, HELLO_PAYLOAD.pack(-1 if seed is None else seed)))
+
+    def send_input(self, inputs):
+        self.sequence += 1
+        self.pending.append((self.sequence, inputs))
+        self.transport.send(encode(INPUT, INPUT_PAYLOAD.pack(self.sequence, inputs)))
+
+    def poll(self):
+        # Apply every state that arrived; returns True if the world changed
+        start = time.perf_counter()
+        acknowledged = None
+        for message in self.transport.receive():
+            kind, payload = decode(message)
+            if kind == BYE:
+                self.transport.close()
+            elif kind == STATE:
+                tick, sequence, keyframe, bursts = STATE_PAYLOAD.unpack_from(payload)
+                body = payload[STATE_PAYLOAD.size + bursts * BURST.size:]
+                if not keyframe and self.state is None:
+                    continue  # left over from before start(); wait for a keyframe
+                if keyframe:
+                    self.state = zlib.decompress(body)
+                else:
+                    self.state = snapshot.apply_delta(self.state, body, self.world)
+                self.server_tick, acknowledged = tick, sequence
+                # Particles are the client's own: move them a tick, then add
+                # the ones the server spawned in it, as World.step would
+                self.world.update_particles(self.delta_time)
+                for index in range(bursts):
+                    self.world.spawn_particles(*BURST.unpack_from(payload, STATE_PAYLOAD.size + index * BURST.size))
+                self.world.particle_bursts.clear()
+        if acknowledged is None:
+            self.cpu_time += time.perf_counter() - start
+            return False
+
+        snapshot.restore(self.world, self.state)
+        while self.pending and self.pending[0][0] <= acknowledged:
+            self.pending.popleft()
+        if not self.world.game_over:
+            # Prediction: replay what the server hasn't applied yet on top of its state
+            for _, inputs in self.pending:
+                self.world.update_player(self.delta_time, inputs)
+        self.cpu_time += time.perf_counter() - start
+        return True
+
+    def close(self):
+        self.transport.send(encode(BYE))
+        self.transport.close()
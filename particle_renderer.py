@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pygame
+
+# Particle drawing stage. Particles are blitted onto a dedicated SRCALPHA layer
+# from a cache of pre-rasterized circles, one per radius and alpha step, in a
+# single blits() call; the part of the layer they cover is then composited onto
+# the screen with one alpha blit, so the fade actually shows. Past the budget,
+# every k-th particle is drawn k times larger in area instead, which keeps the
+# cost of a big burst flat.
+
+class ParticleRenderer:
+    def __init__(self, view_size, color, lifetime, budget=256, alpha_steps=16, max_radius=8):
+        self.layer = pygame.Surface(view_size, pygame.SRCALPHA)
+        self.color = color
+        self.lifetime = lifetime
+        self.budget = budget
+        self.alpha_steps = alpha_steps
+        self.max_radius = max_radius
+        self.sprites = {}
+        self.area = None  # part of the layer drawn last frame
+        self.frame = 0
+        self.drawn = 0
+
+    def sprite(self, radius, step):
+        key = (radius, step)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            alpha = 255 * step // self.alpha_steps
+            sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (self.color[0], self.color[1], self.color[2], alpha), (radius, radius), radius)
+            self.sprites[key] = sprite
+        return sprite
+
+    def draw(self, surface, pos, lifetime, radius, offset):
+        # pos, lifetime and radius describe the particles to draw, in world
+        # coordinates; returns the screen rect that was composited, or None
+        self.frame += 1
+        layer = self.layer
+        if self.area is not None:
+            layer.fill((0, 0, 0, 0), self.area)
+            self.area = None
+
+        count = len(pos)
+        if count > self.budget:
+            # Level of detail: every stride-th particle, with stride times the area
+            stride = math.ceil(count / self.budget)
+            pos = pos[::stride]
+            lifetime = lifetime[::stride]
+            radius = np.minimum(self.max_radius, np.rint(radius[::stride] * math.sqrt(stride)))
+        steps = np.ceil(lifetime / self.lifetime * self.alpha_steps).clip(0, self.alpha_steps).astype(np.int64)
+        shown = steps > 0
+        radius = np.asarray(radius[shown], dtype=np.int64)
+        self.drawn = len(radius)
+        if not self.drawn:
+            return None
+
+        corners = np.floor(pos[shown] - offset - radius[:, np.newaxis]).astype(np.int64)
+        sprite = self.sprite
+        rects = layer.blits([(sprite(r, step), corner)
+                             for r, step, corner in zip(radius.tolist(), steps[shown].tolist(), corners.tolist())])
+        area = rects[0].unionall(rects[1:]).clip(layer.get_rect())
+        if not area:
+            return None
+        surface.blit(layer, area.topleft, area)
+        self.area = area
+        return area
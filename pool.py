@@ -0,0 +1,32 @@
+# Fixed-size pool of reusable objects. Instances are created up front and
+# handed back out after release, so steady-state play allocates nothing; when
+# the pool runs dry a new instance is made and counted as a miss.
+
+class ObjectPool:
+    def __init__(self, factory, capacity):
+        self.factory = factory
+        self.free = [factory() for _ in range(capacity)]
+        self.size = capacity
+        self.in_use = 0
+        self.high_water = 0
+        self.misses = 0
+
+    def acquire(self):
+        if self.free:
+            obj = self.free.pop()
+        else:
+            obj = self.factory()
+            self.size += 1
+            self.misses += 1
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return obj
+
+    def release(self, obj):
+        self.in_use -= 1
+        self.free.append(obj)
+
+    def stats(self):
+        return {"size": self.size, "in_use": self.in_use,
+                "high_water": self.high_water, "misses": self.misses}
@@ -0,0 +1,135 @@
+import json
+import time
+from collections import deque
+
+import pygame
+
+# Lightweight frame profiler. Named scopes record (name, start, end) into the
+# current frame, and finished frames go into a fixed-size ring buffer that
+# feeds the in-game overlay and the Chrome trace export. When disabled,
+# scope() hands back a shared no-op context manager, so instrumented code
+# pays one method call per phase.
+
+class _NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SCOPE = _NullScope()
+
+class _Scope:
+    __slots__ = ("events", "name", "start")
+
+    def __init__(self, events, name):
+        self.events = events
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.events.append((self.name, self.start, time.perf_counter()))
+        return False
+
+class Profiler:
+    def __init__(self, enabled=False, max_frames=300):
+        self.enabled = enabled
+        self.overlay = False
+        self.enabled_without_overlay = enabled
+        self.frames = deque(maxlen=max_frames)
+        self.events = []
+        self.frame_start = None
+
+    def scope(self, name):
+        if not self.enabled:
+            return NULL_SCOPE
+        return _Scope(self.events, name)
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+            self.events = []
+
+    def end_frame(self):
+        if self.enabled and self.frame_start is not None:
+            self.frames.append((self.frame_start, time.perf_counter(), self.events))
+            self.events = []
+            self.frame_start = None
+
+    def toggle_overlay(self):
+        # The overlay needs timings; hiding it goes back to recording them
+        # only if that was already happening (e.g. for --profile)
+        self.overlay = not self.overlay
+        if self.overlay:
+            self.enabled_without_overlay = self.enabled
+            self.enabled = True
+        else:
+            self.enabled = self.enabled_without_overlay
+
+    def frame_times(self):
+        return [end - start for start, end, _ in self.frames]
+
+    def phase_averages(self):
+        # Mean seconds per frame spent in each named scope, in first-seen order
+        totals = {}
+        for _, _, events in self.frames:
+            for name, start, end in events:
+                totals[name] = totals.get(name, 0.0) + (end - start)
+        count = max(1, len(self.frames))
+        return {name: total / count for name, total in totals.items()}
+
+    def export_chrome_trace(self, path):
+        # Complete ("X") events in microseconds; load in chrome://tracing or Perfetto
+        events = []
+        origin = self.frames[0][0] if self.frames else 0.0
+        for index, (start, end, scopes) in enumerate(self.frames):
+            events.append({"name": "frame", "ph": "X", "pid": 0, "tid": 0,
+                           "ts": (start - origin) * 1e6, "dur": (end - start) * 1e6,
+                           "args": {"frame": index}})
+            for name, scope_start, scope_end in scopes:
+                events.append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                               "ts": (scope_start - origin) * 1e6, "dur": (scope_end - scope_start) * 1e6})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def draw_overlay(self, surface, font, text_cache, target_frame_time, status=None):
+        # Rolling frame-time graph with a target line, an optional status line,
+        # then one bar per phase
+        width, graph_height, bar_height, label_width = 340, 80, 14, 180
+        phases = self.phase_averages()
+        status_height = 18 if status else 0
+        height = graph_height + 20 + status_height + len(phases) * (bar_height + 2) + 10
+        x = surface.get_width() - width - 10
+        y = 10
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        surface.blit(panel, (x, y))
+
+        scale = graph_height / (target_frame_time * 2)
+        times = self.frame_times()[-width:]
+        for i, frame_time in enumerate(times):
+            line_height = min(graph_height, frame_time * scale)
+            color = (0, 255, 0) if frame_time <= target_frame_time else (255, 80, 80)
+            gx = x + width - len(times) + i
+            pygame.draw.line(surface, color, (gx, y + graph_height), (gx, y + graph_height - line_height))
+        target_y = y + graph_height - target_frame_time * scale
+        pygame.draw.line(surface, (255, 255, 0), (x, target_y), (x + width - 1, target_y))
+        if times:
+            label = text_cache.render(font, f"frame {times[-1] * 1000:.1f} ms", (255, 255, 255))
+            surface.blit(label, (x + 4, y + graph_height + 2))
+
+        bar_y = y + graph_height + 20
+        if status:
+            surface.blit(text_cache.render(font, status, (255, 255, 255)), (x + 4, bar_y))
+            bar_y += status_height
+        bar_scale = (width - label_width - 4) / target_frame_time
+        for name, seconds in phases.items():
+            label = text_cache.render(font, f"{name} {seconds * 1000:.2f}", (255, 255, 255))
+            surface.blit(label, (x + 4, bar_y))
+            bar_width = max(1, min(width - label_width - 4, int(seconds * bar_scale)))
+            pygame.draw.rect(surface, (0, 160, 255), (x + label_width, bar_y + 2, bar_width, bar_height - 4))
+            bar_y += bar_height + 2
+        return pygame.Rect(x, y, width, height)
@@ -0,0 +1,37 @@
+import argparse
+import time
+
+import game
+from input_log import InputLog
+
+# Replay a recorded input log headlessly, as fast as the CPU allows.
+
+def replay(log, world=None):
+    if world is None:
+        world = game.World(log.seed)
+    else:
+        world.reset(log.seed)
+    for inputs in log.inputs:
+        world.step(log.delta_time, inputs)
+    return world
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded game headlessly.")
+    parser.add_argument("path")
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many times (for benchmarking)")
+    args = parser.parse_args(argv)
+
+    log = InputLog.load(args.path)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        world = replay(log)
+    elapsed = time.perf_counter() - start
+
+    print(f"seed: {log.seed}  ticks: {world.ticks}  score: {world.score}"
+          f"  survival: {world.survival_time:.2f}s  game_over: {world.game_over}")
+    print(f"{world.ticks * args.repeat / elapsed:.0f} ticks/s ({elapsed:.3f}s)")
+    if log.final_score >= 0 and world.score != log.final_score:
+        raise SystemExit(f"replay diverged: recorded score {log.final_score}, replayed {world.score}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import time
+
+# Frame pacing for the interactive loop. Wall-clock time feeds a fixed-timestep
+# accumulator, so the simulation always advances at its tick rate; render
+# frames are paced separately against a target frame rate. A frame whose ticks
+# alone took longer than a frame period skips its render (up to max_skipped in
+# a row) and the loop goes straight back to simulating, so under load the
+# simulation catches up instead of slowing down. delay() says how long the
+# caller can sleep before the next frame is due, which is the only place the
+# loop gives time back to the event loop.
+
+class FrameScheduler:
+    def __init__(self, tick_dt, frame_rate, max_frame_time=0.25, max_skipped=5, clock=time.perf_counter):
+        self.tick_dt = tick_dt
+        self.frame_period = 1.0 / frame_rate
+        self.max_frame_time = max_frame_time
+        self.max_skipped = max_skipped
+        self.clock = clock
+        self.skipped_frames = 0
+        self.fps = 0.0
+        self.tick_rate = 0.0
+        self._window_start = clock()
+        self._window_frames = 0
+        self._window_ticks = 0
+        self.reset()
+
+    def reset(self):
+        # Drop pending simulation time, e.g. when a new game starts
+        self.accumulator = 0.0
+        self.last_time = None
+        self.next_frame = None
+        self.rendering = False
+        self.consecutive_skips = 0
+
+    @property
+    def alpha(self):
+        # How far render time is between the last tick and the next, 0..1
+        return min(1.0, self.accumulator / self.tick_dt)
+
+    def begin_frame(self):
+        now = self.clock()
+        if self.last_time is not None:
+            self.accumulator += min(now - self.last_time, self.max_frame_time)
+        self.last_time = now
+        self.rendering = False
+
+    def ticks(self):
+        # Yields once per simulation tick that is due
+        while self.accumulator >= self.tick_dt:
+            self.accumulator -= self.tick_dt
+            self._window_ticks += 1
+            yield
+
+    def should_render(self):
+        # False when this frame's ticks used up a whole frame period
+        overran = self.clock() - self.last_time > self.frame_period
+        if overran and self.consecutive_skips < self.max_skipped:
+            self.consecutive_skips += 1
+            self.skipped_frames += 1
+            return False
+        self.consecutive_skips = 0
+        self.rendering = True
+        return True
+
+    def end_frame(self):
+        now = self.clock()
+        if self.rendering:
+            self._window_frames += 1
+            if self.next_frame is None:
+                self.next_frame = self.last_time
+            self.next_frame += self.frame_period
+            if now - self.next_frame > self.frame_period:
+                # Too far behind to catch up on frames; start pacing from here
+                self.next_frame = now
+
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self.tick_rate = self._window_ticks / elapsed
+            self._window_start = now
+            self._window_frames = 0
+            self._window_ticks = 0
+
+    def delay(self):
+        # Seconds until the next frame is due, never negative; a skipped
+        # frame goes straight on to the next one
+        if self.next_frame is None or not self.rendering:
+            return 0.0
+        return max(0.0, self.next_frame - self.clock())
+
+    def stats(self):
+        return {"fps": self.fps, "tick_rate": self.tick_rate, "skipped_frames": self.skipped_frames}
@@ -0,0 +1,96 @@
+import argparse
+import json
+import sys
+import time
+
+import game
+import headless
+from net import Client, LoopbackTransport, SocketTransport, TickServer
+
+# Authoritative tick server, plus a load generator that connects N simulated
+# clients (each driven by a headless input policy) to an in-process server and
+# reports bandwidth and CPU per session.
+
+def make_server(keyframe_interval):
+    return TickServer(game.World, game.SIM_DT, keyframe_interval,
+                      held_inputs=0xFF & ~game.INPUT_SHIELD)
+
+def connect_clients(server, count, transport, port):
+    clients = []
+    for _ in range(count):
+        if transport == "loopback":
+            server_end, client_end = LoopbackTransport.pair()
+            server.add_session(server_end)
+        else:
+            client_end = SocketTransport.connect("127.0.0.1", port)
+        clients.append(Client(client_end, game.World(0), game.SIM_DT))
+    return clients
+
+def run_load(clients, ticks, policy, seed, transport, keyframe_interval):
+    server = make_server(keyframe_interval)
+    port = server.listen("127.0.0.1", 0) if transport == "socket" else None
+    clients = connect_clients(server, clients, transport, port)
+    policies = [headless.POLICIES[policy](seed + i) for i in range(len(clients))]
+    for i, client in enumerate(clients):
+        client.start(seed + i)
+
+    server_time = 0.0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for client, client_policy in zip(clients, policies):
+            if client.world.game_over:
+                client.start()  # keep every session busy for the whole run
+            client.send_input(client_policy(client.world))
+        tick_start = time.perf_counter()
+        server.tick()
+        server_time += time.perf_counter() - tick_start
+        for client in clients:
+            client.poll()
+    elapsed = time.perf_counter() - start
+
+    stats = server.stats()
+    sessions = max(1, len(clients))
+    return {
+        "clients": len(clients),
+        "transport": transport,
+        "ticks": ticks,
+        "keyframe_interval": keyframe_interval,
+        "server_ms_per_tick": server_time / ticks * 1000.0,
+        "server_us_per_session_tick": server_time / ticks / sessions * 1e6,
+        "client_us_per_tick": sum(client.cpu_time for client in clients) / ticks / sessions * 1e6,
+        "down_bytes_per_session_tick": stats["bytes_sent"] / ticks / sessions,
+        "down_kbit_per_session": stats["bytes_sent"] / ticks / sessions * 8 * game.FPS / 1000.0,
+        "up_bytes_per_session_tick": stats["bytes_received"] / ticks / sessions,
+        "max_sessions_at_tick_rate": game.SIM_DT / (server_time / ticks / sessions),
+        "wall_seconds": elapsed,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the authoritative tick server, or load-test it.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--keyframe-interval", type=int, default=game.FPS, help="ticks between full states")
+    parser.add_argument("--load", type=int, metavar="N", help="simulate N clients instead of serving")
+    parser.add_argument("--transport", choices=("loopback", "socket"), default="loopback",
+                        help="how simulated clients connect (with --load)")
+    parser.add_argument("--ticks", type=int, default=600, help="ticks to simulate (with --load)")
+    parser.add_argument("--policy", choices=sorted(headless.POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.load is not None:
+        result = run_load(args.load, args.ticks, args.policy, args.seed, args.transport, args.keyframe_interval)
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+
+    server = make_server(args.keyframe_interval)
+    port = server.listen(args.host, args.port)
+    print(f"serving on {args.host}:{port} at {game.FPS} ticks/s", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
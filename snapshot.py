@@ -0,0 +1,201 @@
+import struct
+import zlib
+from collections import deque
+
+import numpy as np
+
+# Binary world snapshots. capture() packs everything a World needs to carry on
+# stepping - scalars, the RNG state, the raw rows of every entity store and the
+# power-ups - into one bytes object with struct and NumPy, and restore() loads
+# it back into an existing World, so a restored world steps exactly like the
+# original would have. The spatial grid is derived state and is rebuilt.
+# Leaving out the RNG state and the particles (include_rng=False,
+# include_particles=False) gives the smaller view of the world a network
+# client needs to draw it; restoring that leaves both alone.
+# delta() / apply_delta() encode one snapshot against another as a compressed
+# XOR, section by section, and SnapshotRing keeps the most recent ones for
+# rewinding.
+
+MAGIC = b"GSNP"
+VERSION = 4
+HEADER = struct.Struct("<4sBB")
+FLAG_RNG = 1
+FLAG_PARTICLES = 2
+SCALARS = struct.Struct("<qQd8d6dqi???B")  # seed signed, like the input log
+RNG_STATE = struct.Struct("<625I?d")
+COUNT = struct.Struct("<I")
+POWERUP = struct.Struct("<ddB")
+
+DELTA_MAGIC = b"GDLT"
+DELTA_VERSION = 2
+DELTA_HEADER = struct.Struct("<4sBII")
+SECTION_LENGTHS = np.dtype("<u4")
+
+STORES = ("bullets", "enemy_bullets", "particles", "blocks", "red_circles", "triangles")
+CAUSES = (None, "block", "red_circle", "triangle", "enemy_bullet")
+POWERUP_TYPES = ("speed", "shield")
+
+def _stores(flags):
+    return [name for name in STORES if name != "particles" or flags & FLAG_PARTICLES]
+
+def capture(world, include_rng=True, include_particles=True):
+    flags = (FLAG_RNG if include_rng else 0) | (FLAG_PARTICLES if include_particles else 0)
+    parts = [
+        HEADER.pack(MAGIC, VERSION, flags),
+        SCALARS.pack(world.seed, world.ticks, world.survival_time,
+                     *world.player_pos, *world.previous_player_pos,
+                     *world.player_velocity, *world.last_direction,
+                     world.fire_timer, world.spawn_timer, world.powerup_spawn_timer,
+                     world.shield_timer, world.speed_boost_timer, world.current_player_speed,
+                     world.score, world.shield_uses,
+                     world.game_over, world.shield_active, world.speed_boost_active,
+                     CAUSES.index(world.cause_of_death)),
+    ]
+    if include_rng:
+        version, internal, gauss_next = world.rng.getstate()
+        parts.append(RNG_STATE.pack(*internal, gauss_next is not None, gauss_next or 0.0))
+    for name in _stores(flags):
+        store = getattr(world, name)
+        parts.append(COUNT.pack(store.count))
+        parts.append(store.pack())
+    parts.append(COUNT.pack(len(world.powerups)))
+    for powerup in world.powerups:
+        parts.append(POWERUP.pack(powerup.pos[0], powerup.pos[1], POWERUP_TYPES.index(powerup.type)))
+    return b"".join(parts)
+
+def restore(world, data):
+    magic, version, flags = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a world snapshot (or an unsupported version)")
+    offset = HEADER.size
+    values = SCALARS.unpack_from(data, offset)
+    offset += SCALARS.size
+    (world.seed, world.ticks, world.survival_time,
+     px, py, ppx, ppy, vx, vy, dx, dy,
+     world.fire_timer, world.spawn_timer, world.powerup_spawn_timer,
+     world.shield_timer, world.speed_boost_timer, world.current_player_speed,
+     world.score, world.shield_uses,
+     world.game_over, world.shield_active, world.speed_boost_active, cause) = values
+    world.player_pos = [px, py]
+    world.previous_player_pos = [ppx, ppy]
+    world.player_velocity = [vx, vy]
+    world.last_direction = [dx, dy]
+    world.cause_of_death = CAUSES[cause]
+
+    if flags & FLAG_RNG:
+        rng_state = RNG_STATE.unpack_from(data, offset)
+        offset += RNG_STATE.size
+        world.rng.setstate((3, rng_state[:625], rng_state[626] if rng_state[625] else None))
+
+    for name in _stores(flags):
+        (count,) = COUNT.unpack_from(data, offset)
+        offset = getattr(world, name).unpack(count, data, offset + COUNT.size)
+
+    for powerup in world.powerups:
+        world.powerup_pool.release(powerup)
+    world.powerups.clear()
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for _ in range(count):
+        x, y, type_index = POWERUP.unpack_from(data, offset)
+        offset += POWERUP.size
+        powerup = world.powerup_pool.acquire()
+        powerup.place(x, y, POWERUP_TYPES[type_index])
+        world.powerups.append(powerup)
+    world.index_entities()
+
+def _sections(world, data):
+    # Lengths of the parts of a snapshot that delta() XORs separately: what
+    # comes before the stores, each store's count and each of its fields, and
+    # the power-ups. world only supplies the stores' row sizes.
+    flags = HEADER.unpack_from(data)[2]
+    lengths = [HEADER.size + SCALARS.size + (RNG_STATE.size if flags & FLAG_RNG else 0)]
+    offset = lengths[0]
+    for name in _stores(flags):
+        (count,) = COUNT.unpack_from(data, offset)
+        fields = [count * size for size in getattr(world, name).row_sizes]
+        lengths.append(COUNT.size)
+        lengths += fields
+        offset += COUNT.size + sum(fields)
+    lengths.append(len(data) - offset)
+    return np.array(lengths, dtype=SECTION_LENGTHS)
+
+def _spread(lengths, sizes):
+    # Where each byte of sections of the given lengths lands once every
+    # section is padded to its entry in sizes and they're put end to end
+    lengths, sizes = lengths.astype(np.int64), sizes.astype(np.int64)
+    shift = (np.cumsum(sizes) - sizes) - (np.cumsum(lengths) - lengths)
+    return np.arange(int(lengths.sum())) + np.repeat(shift, lengths)
+
+def _padded(data, lengths, sizes):
+    if np.array_equal(lengths, sizes):
+        return np.frombuffer(data, dtype=np.uint8)
+    padded = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    padded[_spread(lengths, sizes)] = np.frombuffer(data, dtype=np.uint8)
+    return padded
+
+def delta(base, target, world):
+    # target encoded against base, both snapshots of worlds laid out like
+    # world: the section lengths and then every section XORed with the same
+    # one in base, padded to the longer of the two so that a store whose
+    # count changed only differs at its end, compressed. Unchanged bytes
+    # become zeros, which is what makes it small.
+    base_lengths, target_lengths = _sections(world, base), _sections(world, target)
+    if len(base_lengths) != len(target_lengths):
+        raise ValueError("a delta needs two snapshots with the same contents")
+    sizes = np.maximum(base_lengths, target_lengths)
+    changed = _padded(target, target_lengths, sizes) ^ _padded(base, base_lengths, sizes)
+    body = (base_lengths ^ target_lengths).tobytes() + changed.tobytes()
+    return DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, len(base), len(target)) + zlib.compress(body, 1)
+
+def apply_delta(base, data, world):
+    magic, version, base_length, target_length = DELTA_HEADER.unpack_from(data)
+    if magic != DELTA_MAGIC or version != DELTA_VERSION:
+        raise ValueError("not a snapshot delta (or an unsupported version)")
+    if base_length != len(base):
+        raise ValueError(f"delta expects a {base_length} byte base snapshot, got {len(base)} bytes")
+    body = zlib.decompress(data[DELTA_HEADER.size:])
+    base_lengths = _sections(world, base)
+    target_lengths = np.frombuffer(body, dtype=SECTION_LENGTHS, count=len(base_lengths)) ^ base_lengths
+    sizes = np.maximum(base_lengths, target_lengths)
+    changed = np.frombuffer(body, dtype=np.uint8, offset=base_lengths.nbytes)
+    if len(changed) != sizes.sum() or target_lengths.sum() != target_length:
+        raise ValueError("snapshot delta is truncated")
+    changed = changed ^ _padded(base, base_lengths, sizes)
+    if np.array_equal(target_lengths, sizes):
+        return changed.tobytes()
+    return changed[_spread(target_lengths, sizes)].tobytes()
+
+class SnapshotRing:
+    # The last `capacity` snapshots of one world, oldest first
+    def __init__(self, capacity):
+        self.snapshots = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def clear(self):
+        self.snapshots.clear()
+
+    def push(self, world):
+        data = capture(world)
+        self.snapshots.append((world.ticks, data))
+        return data
+
+    def latest(self):
+        return self.snapshots[-1][1] if self.snapshots else None
+
+    def rewind(self, world, ticks):
+        # Restore world to the newest snapshot at least `ticks` ticks before
+        # the latest one, dropping everything after it; returns the tick that
+        # was restored, or None if the history doesn't go back that far
+        if not self.snapshots:
+            return None
+        target = self.snapshots[-1][0] - ticks
+        if self.snapshots[0][0] > target:
+            return None
+        while self.snapshots[-1][0] > target:
+            self.snapshots.pop()
+        tick, data = self.snapshots[-1]
+        restore(world, data)
+        return tick
@@ -0,0 +1,127 @@
+# Uniform-grid spatial index used as the collision broad-phase.
+# Boxes live in flat NumPy arrays in insertion order, and the grid itself is a
+# sorted array of (cell, box) entries, built the first time it is needed after
+# a change; neither a rebuild nor a batch of queries runs Python code per box.
+# Queries return hits in insertion order, so callers see the same "first match
+# wins" order as a plain list scan.
+# Fast movers are swept: sweep_boxes() finds when boxes moving over a tick
+# first overlapped the ones they were paired with, so nothing slips through
+# between ticks however large the tick is.
+
+import bisect
+
+import numpy as np
+
+DIRECT_PAIRS = 4096  # area x box pairs up to which pairs() skips the cells
+_NONE = np.zeros(0, dtype=np.int64)
+
+def sweep_boxes(offset, travel, reach):
+    # Fraction of the tick at which each of n boxes that moved by travel (n, 2)
+    # and ended at offset (n, 2) from a fixed box's center first overlapped it
+    # (reach is the sum of the two boxes' half sizes), or inf where it never
+    # did. Going back u of the way, the overlap test is
+    # |offset - travel * u| < reach on both axes, so at u = 0 this is exactly
+    # the overlap test at the end position.
+    moving = travel != 0
+    divisor = np.where(moving, travel, 1)
+    low = (offset - reach) / divisor
+    high = (offset + reach) / divisor
+    inside = np.abs(offset) < reach
+    enter = np.where(moving, np.minimum(low, high), np.where(inside, -np.inf, np.inf)).max(axis=1)
+    leave = np.where(moving, np.maximum(low, high), np.where(inside, np.inf, -np.inf)).min(axis=1)
+    hit = (enter < leave) & (enter < 1) & (leave > 0)
+    return np.where(hit, 1 - np.minimum(leave, 1), np.inf)
+
+def _spread(starts, counts):
+    # starts[i], starts[i] + 1, ... counts[i] values for every i, concatenated
+    total = int(counts.sum())
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+
+def _cells(left, top, right, bottom, cell_size):
+    # Every cell each area [left, right) x [top, bottom) covers, as the index
+    # of the area and the cell's key
+    x0 = np.floor(left / cell_size).astype(np.int64)
+    y0 = np.floor(top / cell_size).astype(np.int64)
+    columns = np.ceil(right / cell_size).astype(np.int64) - x0
+    rows = np.ceil(bottom / cell_size).astype(np.int64) - y0
+    counts = columns * rows
+    owner = np.repeat(np.arange(len(x0)), counts)
+    within = _spread(np.zeros(len(x0), dtype=np.int64), counts)
+    cx = x0[owner] + within % columns[owner]
+    cy = y0[owner] + within // columns[owner]
+    return owner, (cx << 32) + cy
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        # batches holds (label, rows, boxes): a batch insert's items are
+        # (label, row) for each of rows, a single insert's item is label itself
+        self.batches = []
+        self.starts = []
+        self.count = 0
+        self.flat = None
+        self.index = None
+
+    def _add(self, label, rows, boxes):
+        self.batches.append((label, rows, boxes))
+        self.starts.append(self.count)
+        self.count += boxes.shape[1]
+        self.flat = self.index = None
+
+    def insert(self, item, rect):
+        left, top, width, height = rect
+        self._add(item, None, np.array([[left], [top], [left + width], [top + height]], dtype=np.int64))
+
+    def insert_many(self, label, rows, boxes):
+        # A (4, n) integer array of n boxes' lefts, tops, rights and bottoms,
+        # one item (label, row) per row of rows (any sequence of ints)
+        self._add(label, rows, boxes)
+
+    def boxes(self):
+        # (4, n) array of every box's left, top, right and bottom, in insertion
+        # order; one array per side keeps the tests below on contiguous data
+        if self.flat is None:
+            parts = [boxes for _, _, boxes in self.batches]
+            self.flat = np.concatenate(parts, axis=1) if parts else np.zeros((4, 0), dtype=np.int64)
+        return self.flat
+
+    def item(self, index):
+        batch = bisect.bisect_right(self.starts, index) - 1
+        label, rows, _ = self.batches[batch]
+        return label if rows is None else (label, int(rows[index - self.starts[batch]]))
+
+    def query(self, rect):
+        # Items whose box overlaps rect, tested against every box at once
+        left, top, width, height = rect
+        boxes = self.boxes()
+        hit = (boxes[0] < left + width) & (boxes[1] < top + height) & (boxes[2] > left) & (boxes[3] > top)
+        return [self.item(index) for index in np.flatnonzero(hit).tolist()]
+
+    def pairs(self, low, high):
+        # Broad phase for many areas at once, each spanning [low, high) given
+        # as (n, 2) arrays of x and y: (area, box) index arrays of every area
+        # and box that may overlap, each pair once, ordered by area and then
+        # box. With few enough of them every pair is tested directly, which
+        # beats building the cells.
+        if len(low) * self.count <= DIRECT_PAIRS:
+            left, top, right, bottom = self.boxes()
+            overlap = ((left < high[:, 0, np.newaxis]) & (top < high[:, 1, np.newaxis]) &
+                       (right > low[:, 0, np.newaxis]) & (bottom > low[:, 1, np.newaxis]))
+            return np.nonzero(overlap) if overlap.any() else (_NONE, _NONE)
+        if self.index is None:
+            owner, keys = _cells(*self.boxes(), self.cell_size)
+            order = np.argsort(keys, kind="stable")
+            self.index = (keys[order], owner[order])
+        keys, owners = self.index
+        area, cells = _cells(low[:, 0], low[:, 1], high[:, 0], high[:, 1], self.cell_size)
+        first = np.searchsorted(keys, cells, side="left")
+        counts = np.searchsorted(keys, cells, side="right") - first
+        size = max(self.count, 1)
+        pairs = np.unique(np.repeat(area, counts) * size + owners[_spread(first, counts)])
+        return pairs // size, pairs % size
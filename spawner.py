@@ -0,0 +1,58 @@
+import numpy as np
+import pygame
+
+# Bounded spawn placement. A spawn first tries a fixed number of uniformly
+# random candidates; if they all land in an exclusion zone it falls back to a
+# precomputed grid of coarse cells, keeps the ones no exclusion zone touches
+# (one vectorized test per zone) and places the entity inside one of those.
+# Either way a spawn takes bounded time, and it reports failure (None) instead
+# of looping forever when the world is full.
+
+class Spawner:
+    def __init__(self, world_width, world_height, cell_size, max_attempts):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.cell_size = cell_size
+        self.max_attempts = max_attempts
+        xs, ys = np.meshgrid(np.arange(0, world_width, cell_size), np.arange(0, world_height, cell_size))
+        self.cell_x = xs.ravel()
+        self.cell_y = ys.ravel()
+        self.fallbacks = 0
+        self.failures = 0
+
+    def _blocked(self, rect, exclusions, grid):
+        return rect.collidelist(exclusions) != -1 or (grid is not None and grid.query(rect))
+
+    def free_cells(self, exclusions):
+        # Indices of cells that no exclusion zone overlaps
+        free = np.ones(len(self.cell_x), dtype=bool)
+        cs = self.cell_size
+        for zone in exclusions:
+            free &= ~((self.cell_x < zone.right) & (self.cell_x + cs > zone.left) &
+                      (self.cell_y < zone.bottom) & (self.cell_y + cs > zone.top))
+        return np.flatnonzero(free)
+
+    def place(self, rng, width, height, exclusions, grid=None):
+        # Top-left corner for a width x height entity clear of every exclusion
+        # rect (and of everything in grid, if given), or None
+        max_x = self.world_width - width
+        max_y = self.world_height - height
+        rect = pygame.Rect(0, 0, width, height)
+        for _ in range(self.max_attempts):
+            x = rng.randint(0, max_x)
+            y = rng.randint(0, max_y)
+            rect.topleft = (x, y)
+            if not self._blocked(rect, exclusions, grid):
+                return x, y
+
+        self.fallbacks += 1
+        free = self.free_cells(exclusions)
+        for _ in range(min(self.max_attempts, len(free))):
+            cell = free[rng.randrange(len(free))]
+            x = min(int(self.cell_x[cell]) + rng.randint(0, max(0, self.cell_size - width)), max_x)
+            y = min(int(self.cell_y[cell]) + rng.randint(0, max(0, self.cell_size - height)), max_y)
+            rect.topleft = (x, y)
+            if not self._blocked(rect, exclusions, grid):
+                return x, y
+        self.failures += 1
+        return None
@@ -0,0 +1,105 @@
+import pygame
+
+# Sprite atlas. Fixed shapes are drawn once, each onto its own small surface,
+# and then packed into rows of a shared surface; drawing a sprite is a blit of
+# its area of that surface, so a whole pass of them goes to the screen as a
+# single Surface.blits() call. Sprites whose pixels are all either opaque or
+# fully transparent go on a colorkeyed, RLE-accelerated page, which blits much
+# faster than per-pixel alpha; only the ones with soft edges (antialiased
+# text) go on a page with an alpha channel.
+
+COLORKEY = (255, 0, 255)  # must not appear in any opaque sprite
+
+class SpriteAtlas:
+    def __init__(self, width=512, padding=1):
+        self.width = width
+        self.padding = padding
+        self.pending = {}
+        self.keyed = None
+        self.blended = None
+        self.soft = {}
+        self.areas = {}
+        self.anchors = {}
+
+    def add(self, key, surface, anchor=(0, 0)):
+        # surface must have per-pixel alpha; anchor is the point of the sprite
+        # that goes where it is drawn
+        self.pending[key] = (surface, anchor)
+
+    def build(self):
+        # Pack everything added so far, tallest first, into shelves
+        padding = self.padding
+        order = sorted(self.pending.items(), key=lambda item: -item[1][0].get_height())
+        x = y = shelf_height = 0
+        placed = []
+        for key, (surface, anchor) in order:
+            width, height = surface.get_size()
+            if x and x + width > self.width:
+                x, y = 0, y + shelf_height + padding
+                shelf_height = 0
+            placed.append((key, surface, anchor, pygame.Rect(x, y, width, height)))
+            x += width + padding
+            shelf_height = max(shelf_height, height)
+
+        size = (self.width, max(1, y + shelf_height))
+        keyed = pygame.Surface(size)
+        keyed.fill(COLORKEY)
+        blended = pygame.Surface(size, pygame.SRCALPHA)
+        for key, surface, anchor, area in placed:
+            alpha = pygame.surfarray.array_alpha(surface)
+            soft = bool(((alpha > 0) & (alpha < 255)).any())
+            if soft:
+                # Copy the pixels as they are rather than blending them onto
+                # the transparent page, which would darken the soft edges
+                blended.blit(surface, area, special_flags=pygame.BLEND_RGBA_MAX)
+            else:
+                keyed.blit(surface, area)
+            self.soft[key] = soft
+            self.areas[key] = area
+            self.anchors[key] = anchor
+        if pygame.display.get_surface() is not None:
+            keyed = keyed.convert()
+            blended = blended.convert_alpha()
+        keyed.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        self.keyed = keyed
+        self.blended = blended
+        self.pending.clear()
+
+    def page(self, key):
+        return self.blended if self.soft[key] else self.keyed
+
+    def entry(self, key, x, y):
+        # blits() entry drawing the sprite with its anchor at (x, y)
+        anchor = self.anchors[key]
+        return (self.page(key), (x - anchor[0], y - anchor[1]), self.areas[key])
+
+class SpriteBatch:
+    # Atlas sprites queued up in drawing order, then drawn with one blits()
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.entries = []
+        self.keys = []
+
+    def append(self, key, x, y):
+        self.entries.append(self.atlas.entry(key, x, y))
+        self.keys.append(key)
+
+    def extend(self, key, points):
+        # One sprite per row of points, an (n, 2) integer array; key is either
+        # shared by all of them or a list with one key per point
+        atlas = self.atlas
+        if isinstance(key, list):
+            entries = [atlas.entry(k, x, y) for k, (x, y) in zip(key, points.tolist())]
+            self.keys.extend(key)
+        else:
+            page, area = atlas.page(key), atlas.areas[key]
+            entries = [(page, dest, area) for dest in (points - atlas.anchors[key]).tolist()]
+            self.keys.extend([key] * len(entries))
+        self.entries.extend(entries)
+
+    def draw(self, surface, dirty=None):
+        # With a DirtyTracker, each sprite's rect is marked with its key
+        rects = surface.blits(self.entries, doreturn=dirty is not None)
+        if dirty is not None:
+            for rect, key in zip(rects, self.keys):
+                dirty.mark(rect, key)
@@ -0,0 +1,78 @@
+import numpy as np
+
+import ai
+
+def bounce_repeatedly(pos, velocity, half_size, bounds, delta_time, ticks):
+    # The reference: bounce() once per tick, each row for its own tick count
+    pos, velocity = pos.copy(), velocity.copy()
+    for tick in range(int(ticks.max())):
+        live = ticks > tick
+        moved_pos, moved_velocity = pos[live], velocity[live]
+        ai.bounce(moved_pos, moved_velocity, half_size, bounds, delta_time)
+        pos[live], velocity[live] = moved_pos, moved_velocity
+    return pos, velocity
+
+def assert_matches(pos, velocity, half_size, bounds, delta_time, ticks):
+    expected_pos, expected_velocity = bounce_repeatedly(pos, velocity, half_size, bounds, delta_time, ticks)
+    pos, velocity = pos.copy(), velocity.copy()
+    ai.bounce_ahead(pos, velocity, half_size, bounds, delta_time, ticks)
+    np.testing.assert_array_equal(pos, expected_pos)
+    np.testing.assert_array_equal(velocity, expected_velocity)
+
+def test_bounce_ahead_matches_repeated_bounces():
+    rng = np.random.default_rng(0)
+    for trial in range(40):
+        n = 40
+        half_size = int(rng.choice([10, 20]))
+        bounds = (int(rng.integers(100, 800)), int(rng.integers(100, 600)))
+        pos = np.stack([rng.uniform(half_size, bounds[0] - half_size, n),
+                        rng.uniform(half_size, bounds[1] - half_size, n)], axis=1)
+        # Axis-aligned movers like blocks and triangles, including speeds whose
+        # per-tick step rounds differently up and down
+        velocity = np.zeros((n, 2))
+        speed = float(rng.choice([0.0, 30.0, 29.99, 50.0, 100.0, 1000.0]))
+        velocity[np.arange(n), rng.integers(0, 2, n)] = rng.choice([-1, 1], n) * speed
+        ticks = rng.integers(1, 400, n)
+        assert_matches(pos, velocity, half_size, bounds, float(rng.choice([1 / 60, 1 / 15])), ticks)
+
+def test_bounce_ahead_wall_edge_cases():
+    half_size, bounds, delta_time = 20, (200, 100), 1 / 60
+    pos = np.array([
+        [20.0, 50.0],    # touching the left wall, heading into it
+        [180.0, 50.0],   # touching the right wall, heading into it
+        [20.0, 50.0],    # touching the left wall, heading away
+        [21.0, 50.0],    # one step short of the wall, so it clamps
+        [100.0, 20.0],   # touching the top wall, heading into it
+        [100.0, 78.0],   # lands exactly on the bottom edge without passing it
+        [100.0, 50.0],   # standing still
+    ])
+    velocity = np.array([
+        [-100.0, 0.0], [100.0, 0.0], [100.0, 0.0], [-100.0, 0.0],
+        [0.0, -100.0], [0.0, 100.0], [0.0, 0.0],
+    ])
+    for ticks in (1, 2, 3, 30, 31, 1000):
+        assert_matches(pos, velocity, half_size, bounds, delta_time, np.full(len(pos), ticks))
+    assert_matches(pos, velocity, half_size, bounds, delta_time, np.arange(1, len(pos) + 1) * 17)
+
+def test_small_stores_move_like_large_ones(monkeypatch):
+    # Up to DIRECT_ROWS rows are moved in plain Python; the result has to be
+    # bit-identical to the array path, zeros' signs included
+    rng = np.random.default_rng(0)
+    n = 6
+    pos = rng.uniform(0, 300, (n, 2))
+    pos[1] = (5.0, 295.0)  # past two edges
+    velocity = rng.choice([-100.0, 0.0, 29.99, 100.0], (n, 2))
+    targets = rng.uniform(0, 300, (2, 2))
+    pos[2] = targets[0]  # sitting on a target, so it has no direction
+    results = []
+    for direct_rows in (n, 0):
+        monkeypatch.setattr(ai, "DIRECT_ROWS", direct_rows)
+        bounced_pos, bounced_velocity = pos.copy(), velocity.copy()
+        homed_pos, homed_velocity = pos.copy(), velocity.copy()
+        for _ in range(100):
+            ai.bounce(bounced_pos, bounced_velocity, 20, (300, 300), 1 / 60)
+            ai.home(homed_pos, homed_velocity, targets, 100, 1 / 60)
+        results.append((bounced_pos, bounced_velocity, homed_pos, homed_velocity) + ai.aim(pos, targets, 100))
+    for direct, array in zip(*results):
+        np.testing.assert_array_equal(direct, array)
+        np.testing.assert_array_equal(np.signbit(direct), np.signbit(array))
@@ -0,0 +1,52 @@
+import numpy as np
+import pygame
+
+import game
+from spatial import sweep_boxes
+
+def test_zero_length_sweep_is_the_overlap_test():
+    # With no travel, sweep_boxes is the plain rect overlap test at the end
+    # position, hits all at fraction 0
+    rng = np.random.default_rng(0)
+    n = 2000
+    sizes = rng.choice([2, 10, 14, 16, 20, 30, 40], (n, 4))
+    corners = rng.integers(-40, 40, (n, 2))
+    # Centers of a box at the origin and one at corners, so edges can touch
+    offset = corners + sizes[:, 2:] / 2 - sizes[:, :2] / 2
+    reach = (sizes[:, :2] + sizes[:, 2:]) / 2
+    fraction = sweep_boxes(offset, np.zeros((n, 2)), reach)
+    for (w, h, other_w, other_h), (x, y), hit in zip(sizes.tolist(), corners.tolist(), fraction.tolist()):
+        overlap = pygame.Rect(0, 0, w, h).colliderect(pygame.Rect(x, y, other_w, other_h))
+        assert hit == (0 if overlap else np.inf)
+
+def test_fast_bullet_hits_a_block_it_passes_in_one_tick():
+    world = game.World(1)
+    for store in (world.blocks, world.red_circles, world.triangles, world.enemy_bullets, world.bullets):
+        store.clear()
+    world.powerups.clear()
+    x, y = world.player_pos
+    world.add_block(x - game.BLOCK_SIZE / 2, y - 140)
+    world.blocks.velocity[0] = 0
+    world.bullets.add(pos=(x, y - 80), velocity=(0, -game.BULLET_SPEED))
+    # A quarter-second tick carries the bullet 75 px, from below the block to
+    # above it, so it never overlaps the block where it stops
+    world.step(0.25, 0)
+    assert world.blocks.hit_points[0] == game.BLOCK_HIT_POINTS - 1
+    assert world.bullets.count == 0
+
+def test_collisions_follow_an_overridden_size(monkeypatch):
+    # batch.py overrides game constants per run; a world made after that
+    # collides at the new size, not the one game.py was imported with
+    monkeypatch.setattr(game, "BLOCK_SIZE", 80)
+    world = game.World(1)
+    for store in (world.blocks, world.red_circles, world.triangles, world.enemy_bullets, world.bullets):
+        store.clear()
+    world.powerups.clear()
+    x, y = world.player_pos
+    world.add_block(x - 40, y - 190)
+    world.blocks.velocity[0] = 0
+    # 35 px right of the block's center: inside it at 80 px, clear of it at 40
+    world.bullets.add(pos=(x + 35, y - 150), velocity=(0, -game.BULLET_SPEED))
+    world.step(game.SIM_DT, 0)
+    assert world.blocks.hit_points[0] == game.BLOCK_HIT_POINTS - 1
+    assert world.bullets.count == 0
@@ -0,0 +1,32 @@
+import numpy as np
+
+import spatial
+from spatial import SpatialHash
+
+def overlapping(boxes, low, high):
+    # The reference: every (area, box) pair that overlaps, tested one by one
+    return {(area, box) for area in range(len(low)) for box in range(boxes.shape[1])
+            if boxes[0, box] < high[area, 0] and boxes[2, box] > low[area, 0]
+            and boxes[1, box] < high[area, 1] and boxes[3, box] > low[area, 1]}
+
+def test_pairs_through_the_cells_finds_every_overlap(monkeypatch):
+    rng = np.random.default_rng(0)
+    corners = rng.integers(-50, 800, (300, 2))
+    sizes = rng.choice([20, 30, 40], 300)
+    boxes = np.concatenate((corners.T, corners.T + sizes))
+    low = rng.uniform(-100, 850, (60, 2))
+    high = low + rng.uniform(1, 120, (60, 2))
+    grid = SpatialHash(50)
+    grid.insert_many("box", range(300), boxes)
+    expected = overlapping(boxes, low, high)
+
+    monkeypatch.setattr(spatial, "DIRECT_PAIRS", len(low) * len(grid))
+    area, box = grid.pairs(low, high)
+    assert list(zip(area.tolist(), box.tolist())) == sorted(expected)
+
+    monkeypatch.setattr(spatial, "DIRECT_PAIRS", 0)
+    area, box = grid.pairs(low, high)
+    found = list(zip(area.tolist(), box.tolist()))
+    # Sharing a cell is enough to be paired, so the cells can add pairs but never lose one
+    assert found == sorted(set(found))
+    assert expected <= set(found)
@@ -0,0 +1,31 @@
+from collections import OrderedDict
+
+# Bounded LRU cache of rendered text surfaces, keyed by font, string and color.
+# Static labels are rasterized once; dynamic ones (score, timers) only when the
+# string changes, and stale values fall off the end.
+
+class TextCache:
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self.entries.clear()